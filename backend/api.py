@@ -1,17 +1,17 @@
 from fastapi import FastAPI
-from global_rag import GlobalRAG
+from global_rag import get_global_rag
 from schemas import GlobalRAGEntry
 from typing import List, Optional
 
 app = FastAPI()
-rag = GlobalRAG()
+rag = get_global_rag()
 
 @app.post("/ingest")
 def ingest(entry: GlobalRAGEntry):
     rag.ingest(entry)
     return {"status": "ok"}
 
-@app.get("/retrieve")
+@app.get("/retrieve", response_model=List[GlobalRAGEntry])
 def retrieve(
     query: str,
     k: int = 5,
@@ -1,8 +1,14 @@
+import asyncio
+import io
+import logging
 import os
 import shutil
+import threading
 import time
 import uuid
-from typing import List, Optional
+from datetime import datetime
+from collections import OrderedDict
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -13,10 +19,14 @@ import re
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel, Field
 from state_rag_enums import ArtifactType, ArtifactSource
-from artifact import Artifact
-from global_rag import GlobalRAG
+from artifact import Artifact, request_now
+from file_lock import release_lock_files
+from batched_rag import BatchedGlobalRAG
+from global_rag import get_global_rag
 from orchestrator import Orchestrator
+from query_cache import cached_retrieve, fast_hash
 from project_store import (
+    PROJECT_INDEX_FILE,
     PROJECTS_DIR,
     create_project,
     delete_project,
@@ -28,7 +38,117 @@ from state_rag_manager import StateRAGManager
 
 
 app = FastAPI()
+logger = logging.getLogger(__name__)
 AST_SERVICE_URL = os.getenv("AST_SERVICE_URL", "http://127.0.0.1:3001/mutate")
+_LLM_PROVIDER = os.getenv("LLM_PROVIDER", "mock")
+
+# Shared retrieval backends. GlobalRAG loads the embedding model and FAISS
+# index, so it is built once at startup instead of on every request.
+# Concurrent queries against it are batched into single encode/search calls.
+_global_rag: Optional[BatchedGlobalRAG] = None
+
+
+@app.on_event("startup")
+async def _load_global_rag() -> None:
+    global _global_rag
+    _global_rag = BatchedGlobalRAG(await asyncio.to_thread(get_global_rag))
+
+
+# In-memory copy of the project store for GET /api/projects. Kept in sync
+# by the endpoints that mutate the store, and reloaded when the index file
+# changes (another worker created or deleted a project).
+_project_index: Dict[str, Dict] = {}
+_project_index_lock = asyncio.Lock()
+_project_index_state: Optional[tuple] = None
+
+
+def _project_index_signature() -> Optional[tuple]:
+    try:
+        st = os.stat(PROJECT_INDEX_FILE)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+@app.on_event("startup")
+async def _load_project_index() -> None:
+    global _project_index_state
+    # Taken before reading, so a change made during the load is picked
+    # up by the next request
+    _project_index_state = _project_index_signature()
+    projects = await asyncio.to_thread(list_projects)
+    _project_index.clear()
+    _project_index.update((p["project_id"], p) for p in projects)
+
+
+# Recent prompt previews, keyed on everything the preview depends on.
+# The StateRAG revision changes on every commit, so edits never hit stale
+# entries; the GlobalRAG entry count covers ingests.
+_PREVIEW_CACHE_SIZE = 1024
+_preview_cache: "OrderedDict[tuple, PromptPreviewResponse]" = OrderedDict()
+
+
+class _RequestTimeMiddleware:
+    """
+    Plain ASGI middleware that stamps request_now for the whole request.
+    Unlike @app.middleware("http") it adds no extra task or body streaming.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = request_now.set(datetime.utcnow())
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_now.reset(token)
+
+
+app.add_middleware(_RequestTimeMiddleware)
+
+
+# One StateRAGManager per recently used project, shared by the worker
+# threads serving it. The manager locks itself and reloads when another
+# process changes its files, so sharing it is safe.
+_STATE_RAG_CACHE_SIZE = 128
+_state_rags: "OrderedDict[str, StateRAGManager]" = OrderedDict()
+_state_rags_lock = threading.Lock()
+
+
+def _get_state_rag(project_id: str) -> StateRAGManager:
+    with _state_rags_lock:
+        state_rag = _state_rags.get(project_id)
+        if state_rag is None:
+            # Built under the lock so concurrent first requests for a
+            # project can't end up with two managers
+            state_rag = _state_rags[project_id] = StateRAGManager(project_id=project_id)
+        _state_rags.move_to_end(project_id)
+        evicted = [
+            _state_rags.popitem(last=False)[1]
+            for _ in range(len(_state_rags) - _STATE_RAG_CACHE_SIZE)
+        ]
+    # Managers save their semantic index only on compaction; write out
+    # what the evicted ones built so the next load starts from it.
+    for manager in evicted:
+        manager.flush_index()
+    return state_rag
+
+
+def _forget_state_rag(project_id: str) -> None:
+    with _state_rags_lock:
+        _state_rags.pop(project_id, None)
+
+
+@app.on_event("shutdown")
+def _flush_state_rags() -> None:
+    with _state_rags_lock:
+        managers = list(_state_rags.values())
+    for manager in managers:
+        manager.flush_index()
 
 
 class ProjectCreateRequest(BaseModel):
@@ -62,29 +182,43 @@ class PromptPreviewResponse(BaseModel):
     estimated_cost: float
     selected_files: List[str]
 
+class PromptTextResponse(BaseModel):
+    prompt: str
+
+
+class GenerateResponse(BaseModel):
+    artifacts: List[Artifact]
+    injected_files: List[str]
+    llm_provider: str
+    generation_time: float
+
+
 class UIMutationRequest(BaseModel):
     project_id: str
     file_path: str
     mutation: dict
 
-def _init_project_storage(project_id: str) -> None:
+def _write_empty_state(artifacts_path: str) -> None:
+    with open(artifacts_path, "w") as f:
+        f.write("[]")
+
+
+async def _init_project_storage(project_id: str) -> None:
     state_dir = os.path.join(PROJECTS_DIR, project_id, "state_rag")
-    os.makedirs(state_dir, exist_ok=True)
+    await asyncio.to_thread(os.makedirs, state_dir, exist_ok=True)
     artifacts_path = os.path.join(state_dir, "artifacts.json")
     if not os.path.exists(artifacts_path):
-        with open(artifacts_path, "w") as f:
-            f.write("[]")
+        await asyncio.to_thread(_write_empty_state, artifacts_path)
 
 
-def _inject_react_vite_tailwind_scaffold(project_id: str):
-    state_rag = StateRAGManager(project_id=project_id)
-
-    scaffold_files = [
-        Artifact(
-            type=ArtifactType.config,
-            name="index.html",
-            file_path="index.html",
-            content="""<!DOCTYPE html>
+# Scaffold templates are validated once at import; each new project gets
+# cheap copies with fresh ids and timestamps (model_copy skips validation).
+_SCAFFOLD_TEMPLATES: List[Artifact] = [
+    Artifact(
+        type=ArtifactType.config,
+        name="index.html",
+        file_path="index.html",
+        content="""<!DOCTYPE html>
 <html lang="en">
   <head>
     <meta charset="UTF-8" />
@@ -97,14 +231,14 @@ def _inject_react_vite_tailwind_scaffold(project_id: str):
   </body>
 </html>
 """,
-            language="html",
-            source=ArtifactSource.system_generated,
-        ),
-        Artifact(
-            type=ArtifactType.config,
-            name="package.json",
-            file_path="package.json",
-            content="""{
+        language="html",
+        source=ArtifactSource.system_generated,
+    ),
+    Artifact(
+        type=ArtifactType.config,
+        name="package.json",
+        file_path="package.json",
+        content="""{
   "name": "state-rag-app",
   "private": true,
   "version": "0.0.0",
@@ -128,14 +262,14 @@ def _inject_react_vite_tailwind_scaffold(project_id: str):
   }
 }
 """,
-            language="json",
-            source=ArtifactSource.system_generated,
-        ),
-        Artifact(
-            type=ArtifactType.config,
-            name="main.tsx",
-            file_path="src/main.tsx",
-            content="""import React from "react";
+        language="json",
+        source=ArtifactSource.system_generated,
+    ),
+    Artifact(
+        type=ArtifactType.config,
+        name="main.tsx",
+        file_path="src/main.tsx",
+        content="""import React from "react";
 import ReactDOM from "react-dom/client";
 import App from "./App";
 import "./index.css";
@@ -146,14 +280,14 @@ ReactDOM.createRoot(document.getElementById("root")!).render(
   </React.StrictMode>
 );
 """,
-            language="tsx",
-            source=ArtifactSource.system_generated,
-        ),
-        Artifact(
-            type=ArtifactType.layout,
-            name="App.tsx",
-            file_path="src/App.tsx",
-            content="""function App() {
+        language="tsx",
+        source=ArtifactSource.system_generated,
+    ),
+    Artifact(
+        type=ArtifactType.layout,
+        name="App.tsx",
+        file_path="src/App.tsx",
+        content="""function App() {
   return (
     <div className="min-h-screen flex items-center justify-center bg-gray-100">
       <h1 className="text-3xl font-bold text-gray-800">
@@ -165,25 +299,25 @@ ReactDOM.createRoot(document.getElementById("root")!).render(
 
 export default App;
 """,
-            language="tsx",
-            source=ArtifactSource.system_generated,
-        ),
-        Artifact(
-            type=ArtifactType.config,
-            name="index.css",
-            file_path="src/index.css",
-            content="""@tailwind base;
+        language="tsx",
+        source=ArtifactSource.system_generated,
+    ),
+    Artifact(
+        type=ArtifactType.config,
+        name="index.css",
+        file_path="src/index.css",
+        content="""@tailwind base;
 @tailwind components;
 @tailwind utilities;
 """,
-            language="css",
-            source=ArtifactSource.system_generated,
-        ),
-        Artifact(
-            type=ArtifactType.config,
-            name="tailwind.config.js",
-            file_path="tailwind.config.js",
-            content="""export default {
+        language="css",
+        source=ArtifactSource.system_generated,
+    ),
+    Artifact(
+        type=ArtifactType.config,
+        name="tailwind.config.js",
+        file_path="tailwind.config.js",
+        content="""export default {
   content: ["./index.html", "./src/**/*.{js,ts,jsx,tsx}"],
   theme: {
     extend: {},
@@ -191,41 +325,56 @@ export default App;
   plugins: [],
 };
 """,
-            language="js",
-            source=ArtifactSource.system_generated,
-        ),
-        Artifact(
-            type=ArtifactType.config,
-            name="postcss.config.js",
-            file_path="postcss.config.js",
-            content="""export default {
+        language="js",
+        source=ArtifactSource.system_generated,
+    ),
+    Artifact(
+        type=ArtifactType.config,
+        name="postcss.config.js",
+        file_path="postcss.config.js",
+        content="""export default {
   plugins: {
     tailwindcss: {},
     autoprefixer: {},
   },
 };
 """,
-            language="js",
-            source=ArtifactSource.system_generated,
-        ),
-        Artifact(
-            type=ArtifactType.config,
-            name="vite.config.ts",
-            file_path="vite.config.ts",
-            content="""import { defineConfig } from "vite";
+        language="js",
+        source=ArtifactSource.system_generated,
+    ),
+    Artifact(
+        type=ArtifactType.config,
+        name="vite.config.ts",
+        file_path="vite.config.ts",
+        content="""import { defineConfig } from "vite";
 import react from "@vitejs/plugin-react";
 
 export default defineConfig({
   plugins: [react()],
 });
 """,
-            language="ts",
-            source=ArtifactSource.system_generated,
-        ),
+        language="ts",
+        source=ArtifactSource.system_generated,
+    ),
+]
+
+
+def _inject_react_vite_tailwind_scaffold(project_id: str):
+    state_rag = _get_state_rag(project_id)
+
+    now = datetime.utcnow()
+    scaffold_files = [
+        template.model_copy(
+            update={
+                "artifact_id": str(uuid.uuid4()),
+                "created_at": now,
+                "updated_at": now,
+            }
+        )
+        for template in _SCAFFOLD_TEMPLATES
     ]
 
-    for artifact in scaffold_files:
-        state_rag.commit(artifact)
+    state_rag.commit_many(scaffold_files)
 
 
 def _token_count(text: str) -> int:
@@ -236,102 +385,86 @@ def _estimate_cost(token_count: int, cost_per_1k: float = 0.001) -> float:
     return round((token_count / 1000) * cost_per_1k, 6)
 
 
+_SYSTEM_TEXT = (
+    "You are an AI website builder.\n"
+    "You are stateless.\n"
+    "PROJECT STATE is authoritative.\n"
+    "GLOBAL REFERENCES are advisory.\n"
+    "Modify only explicitly allowed files.\n"
+    "Output full updated files only.\n"
+)
+
+_OUTPUT_TEXT = "FILE: <file_path>\n<full file content>\n"
+
+_SECTION_TITLES = (
+    "System Instructions",
+    "Project State (Authoritative)",
+    "Global References (Advisory)",
+    "Allowed Files",
+    "User Request",
+    "Output Format",
+)
+
+
 def _build_prompt_sections(
     user_request: str,
     active_artifacts: List[Artifact],
     global_refs,
     allowed_paths: List[str],
 ) -> List[PromptSection]:
-    sections: List[PromptSection] = []
-
-    system_text = (
-        "You are an AI website builder.\n"
-        "You are stateless.\n"
-        "PROJECT STATE is authoritative.\n"
-        "GLOBAL REFERENCES are advisory.\n"
-        "Modify only explicitly allowed files.\n"
-        "Output full updated files only.\n"
-    )
-    sections.append(
-        PromptSection(
-            title="System Instructions",
-            content=system_text,
-            tokens=_token_count(system_text),
-        )
-    )
+    project_text = "\n".join(
+        [f"--- {artifact.file_path} ---\n{artifact.content}" for artifact in active_artifacts]
+    ) or "(No project artifacts selected.)"
 
-    project_lines = []
-    for artifact in active_artifacts:
-        project_lines.append(f"--- {artifact.file_path} ---")
-        project_lines.append(artifact.content)
-    project_text = "\n".join(project_lines) if project_lines else "(No project artifacts selected.)"
-    sections.append(
-        PromptSection(
-            title="Project State (Authoritative)",
-            content=project_text,
-            tokens=_token_count(project_text),
-        )
-    )
-
-    global_lines = []
-    for idx, ref in enumerate(global_refs, 1):
-        global_lines.append(f"{idx}. {ref.title}")
-        global_lines.append(ref.content)
-    global_text = "\n".join(global_lines) if global_lines else "(No global references retrieved.)"
-    sections.append(
-        PromptSection(
-            title="Global References (Advisory)",
-            content=global_text,
-            tokens=_token_count(global_text),
-        )
-    )
+    global_text = "\n".join(
+        [f"{idx}. {ref.title}\n{ref.content}" for idx, ref in enumerate(global_refs, 1)]
+    ) or "(No global references retrieved.)"
 
     allowed_text = "\n".join(f"- {path}" for path in allowed_paths)
-    sections.append(
-        PromptSection(
-            title="Allowed Files",
-            content=allowed_text,
-            tokens=_token_count(allowed_text),
-        )
-    )
-
-    sections.append(
-        PromptSection(
-            title="User Request",
-            content=user_request,
-            tokens=_token_count(user_request),
-        )
-    )
 
-    output_text = "FILE: <file_path>\n<full file content>\n"
-    sections.append(
-        PromptSection(
-            title="Output Format",
-            content=output_text,
-            tokens=_token_count(output_text),
-        )
+    # Section contents in _SECTION_TITLES order; titles and token counts
+    # are zipped in one pass.
+    contents = (
+        _SYSTEM_TEXT,
+        project_text,
+        global_text,
+        allowed_text,
+        user_request,
+        _OUTPUT_TEXT,
     )
-
-    return sections
+    return [
+        PromptSection(title=title, content=content, tokens=_token_count(content))
+        for title, content in zip(_SECTION_TITLES, contents)
+    ]
 
 
 def _build_prompt_text(sections: List[PromptSection]) -> str:
-    text_sections = []
-    for section in sections:
-        text_sections.append(f"{section.title}:\n{section.content}")
-    return "\n\n".join(text_sections)
+    # Write straight into one buffer instead of holding a formatted copy of
+    # every section alongside the joined result.
+    buf = io.StringIO()
+    for idx, section in enumerate(sections):
+        if idx:
+            buf.write("\n\n")
+        buf.write(section.title)
+        buf.write(":\n")
+        buf.write(section.content)
+    return buf.getvalue()
 
 
 @app.get("/api/projects", response_model=List[ProjectResponse])
-def list_projects_endpoint():
-    return list_projects()
+async def list_projects_endpoint():
+    if _project_index_signature() != _project_index_state:
+        async with _project_index_lock:
+            if _project_index_signature() != _project_index_state:
+                await _load_project_index()
+    return list(_project_index.values())
 
 @app.get("/api/projects/{project_id}/artifacts")
 def list_project_artifacts(project_id: str):
     if not get_project(project_id):
         raise HTTPException(status_code=404, detail="Project not found")
 
-    state_rag = StateRAGManager(project_id=project_id)
+    state_rag = _get_state_rag(project_id)
     artifacts = state_rag.retrieve(file_paths=None,user_query="")
 
     return {
@@ -340,55 +473,84 @@ def list_project_artifacts(project_id: str):
 
 
 @app.post("/api/projects", response_model=ProjectResponse)
-def create_project_endpoint(req: ProjectCreateRequest):
+async def create_project_endpoint(req: ProjectCreateRequest):
     project_id = str(uuid.uuid4())
-    project = create_project(project_id=project_id, name=req.name, template=req.template)
-    _init_project_storage(project_id)
-    _inject_react_vite_tailwind_scaffold(project_id)
+    async with _project_index_lock:
+        project = await asyncio.to_thread(
+            create_project, project_id=project_id, name=req.name, template=req.template
+        )
+        _project_index[project_id] = project
+    await _init_project_storage(project_id)
+    await asyncio.to_thread(_inject_react_vite_tailwind_scaffold, project_id)
     print("Injecting scaffold for:", project_id)
 
     return project
 
 
 @app.get("/api/projects/{project_id}", response_model=ProjectResponse)
-def get_project_endpoint(project_id: str):
-    project = get_project(project_id)
+async def get_project_endpoint(project_id: str):
+    project = await asyncio.to_thread(get_project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     return project
 
 
 @app.delete("/api/projects/{project_id}")
-def delete_project_endpoint(project_id: str):
-    project = get_project(project_id)
+async def delete_project_endpoint(project_id: str):
+    project = await asyncio.to_thread(get_project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    removed = delete_project(project_id)
-    if not removed:
-        raise HTTPException(status_code=500, detail="Failed to delete project")
+    async with _project_index_lock:
+        removed = await asyncio.to_thread(delete_project, project_id)
+        if not removed:
+            raise HTTPException(status_code=500, detail="Failed to delete project")
+        _project_index.pop(project_id, None)
 
     project_dir = os.path.join(PROJECTS_DIR, project_id)
     if os.path.exists(project_dir):
-        shutil.rmtree(project_dir)
+        await asyncio.to_thread(shutil.rmtree, project_dir)
+    _forget_state_rag(project_id)
+    release_lock_files(project_dir)
     return {"status": "ok"}
 
 
 @app.post("/api/prompt/preview", response_model=PromptPreviewResponse)
-def preview_prompt(req: GenerateRequest):
-    if not get_project(req.project_id):
+async def preview_prompt(req: GenerateRequest):
+    if not await asyncio.to_thread(get_project, req.project_id):
         raise HTTPException(status_code=404, detail="Project not found")
 
     allowed_paths = req.allowed_paths or ["*"]
     file_paths = None if "*" in allowed_paths else req.allowed_paths
-    state_rag = StateRAGManager(project_id=req.project_id)
-    active_artifacts = state_rag.retrieve(
-        file_paths=file_paths,
-        user_query=req.user_request
+    state_rag = await asyncio.to_thread(_get_state_rag, req.project_id)
+    # The key reads the managers' in-memory state: pick up writes from
+    # other processes first, or a stale preview would be served.
+    await asyncio.gather(
+        asyncio.to_thread(state_rag.refresh),
+        asyncio.to_thread(_global_rag.refresh),
     )
 
-    global_rag = GlobalRAG()
-    global_refs = global_rag.retrieve(query=req.user_request, k=3)
+    cache_key = (
+        req.project_id,
+        fast_hash(req.user_request),
+        tuple(allowed_paths),
+        state_rag.revision,
+        len(_global_rag.entries),
+    )
+    cached = _preview_cache.get(cache_key)
+    if cached is not None:
+        _preview_cache.move_to_end(cache_key)
+        return cached
+
+    # State and global retrieval are independent; run them side by side.
+    active_artifacts, global_refs = await asyncio.gather(
+        asyncio.to_thread(
+            state_rag.retrieve,
+            file_paths=file_paths,
+            user_query=req.user_request
+        ),
+        asyncio.to_thread(cached_retrieve, _global_rag, req.user_request, 3),
+    )
 
     sections = _build_prompt_sections(
         user_request=req.user_request,
@@ -398,25 +560,31 @@ def preview_prompt(req: GenerateRequest):
     )
 
     total_tokens = sum(section.tokens for section in sections)
-    return PromptPreviewResponse(
+    response = PromptPreviewResponse(
         sections=sections,
         total_tokens=total_tokens,
         estimated_cost=_estimate_cost(total_tokens),
         selected_files=[artifact.file_path for artifact in active_artifacts],
     )
 
+    _preview_cache[cache_key] = response
+    while len(_preview_cache) > _PREVIEW_CACHE_SIZE:
+        _preview_cache.popitem(last=False)
+    return response
+
 
-@app.post("/api/prompt/text")
-def prompt_text(req: GenerateRequest):
-    if not get_project(req.project_id):
+@app.post("/api/prompt/text", response_model=PromptTextResponse)
+async def prompt_text(req: GenerateRequest):
+    if not await asyncio.to_thread(get_project, req.project_id):
         raise HTTPException(status_code=404, detail="Project not found")
 
     allowed_paths = req.allowed_paths or ["*"]
     file_paths = None if "*" in allowed_paths else req.allowed_paths
-    state_rag = StateRAGManager(project_id=req.project_id)
-    active_artifacts = state_rag.retrieve(file_paths=file_paths)
-    global_rag = GlobalRAG()
-    global_refs = global_rag.retrieve(query=req.user_request, k=3)
+    state_rag = await asyncio.to_thread(_get_state_rag, req.project_id)
+    active_artifacts, global_refs = await asyncio.gather(
+        asyncio.to_thread(state_rag.retrieve, file_paths=file_paths),
+        asyncio.to_thread(cached_retrieve, _global_rag, req.user_request, 3),
+    )
 
     sections = _build_prompt_sections(
         user_request=req.user_request,
@@ -424,41 +592,46 @@ def prompt_text(req: GenerateRequest):
         global_refs=global_refs,
         allowed_paths=allowed_paths,
     )
-    return {"prompt": _build_prompt_text(sections)}
+    return PromptTextResponse(prompt=_build_prompt_text(sections))
 
 
-@app.post("/api/generate")
-def generate_code(req: GenerateRequest):
-    if not get_project(req.project_id):
+@app.post("/api/generate", response_model=GenerateResponse)
+async def generate_code(req: GenerateRequest):
+    if not await asyncio.to_thread(get_project, req.project_id):
         raise HTTPException(status_code=404, detail="Project not found")
 
     allowed_paths = req.allowed_paths or ["*"]
-    llm_provider = os.getenv("LLM_PROVIDER", "mock")
-    print("Using LLM Provider:", llm_provider)
+    llm_provider = _LLM_PROVIDER
+    logger.debug("Using LLM Provider: %s", llm_provider)
 
-    state_rag = StateRAGManager(project_id=req.project_id)
-    global_rag = GlobalRAG()
+    state_rag = await asyncio.to_thread(_get_state_rag, req.project_id)
     orchestrator = Orchestrator(
         llm_provider=llm_provider,
         project_id=req.project_id,
         state_rag=state_rag,
-        global_rag=global_rag,
+        global_rag=_global_rag,
     )
 
     start = time.time()
-    artifacts, injected = orchestrator.handle_request(
+    artifacts, injected = await asyncio.to_thread(
+        orchestrator.handle_request,
         user_request=req.user_request,
         allowed_paths=allowed_paths,
     )
     duration = time.time() - start
-    update_project_timestamp(req.project_id)
-
-    return {
-        "artifacts": [artifact.dict() for artifact in artifacts],
-        "injected_files": [a.file_path for a in injected],
-        "llm_provider": llm_provider,
-        "generation_time": round(duration, 3),
-    }
+    async with _project_index_lock:
+        updated = await asyncio.to_thread(update_project_timestamp, req.project_id)
+        if updated:
+            _project_index[req.project_id] = updated
+
+    # Returning the response model lets FastAPI serialize it straight to
+    # JSON bytes with pydantic-core instead of walking plain dicts.
+    return GenerateResponse(
+        artifacts=artifacts,
+        injected_files=[a.file_path for a in injected],
+        llm_provider=llm_provider,
+        generation_time=round(duration, 3),
+    )
 
 @app.post("/api/ui/mutate")
 def ui_mutate(req: UIMutationRequest):
@@ -466,7 +639,7 @@ def ui_mutate(req: UIMutationRequest):
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    state_rag = StateRAGManager(project_id=req.project_id)
+    state_rag = _get_state_rag(req.project_id)
 
     active = state_rag.retrieve(file_paths=[req.file_path])
     if not active:
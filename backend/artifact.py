@@ -1,12 +1,39 @@
 from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional
+from contextvars import ContextVar
 from datetime import datetime
 import uuid
 import os.path
+import re
 
 from state_rag_enums import ArtifactType, ArtifactSource
 
 
+# Set once per API request so every Artifact built while serving it shares
+# a single timestamp instead of reading the clock per field.
+request_now: ContextVar[Optional[datetime]] = ContextVar("request_now", default=None)
+
+
+def _now() -> datetime:
+    return request_now.get() or datetime.utcnow()
+
+
+# Every rejected path prefix in one anchored pattern, matched against the
+# normalized path with forward slashes. The named group says which rule hit.
+_BAD_PATH = re.compile(
+    r"(?P<traversal>\.\.)"
+    r"|(?P<absolute>/|[a-z]:)"
+    r"|(?P<system>(?:etc|sys|root|proc|dev|windows|system32|program files)/)",
+    re.IGNORECASE,
+)
+
+_BAD_PATH_MESSAGES = {
+    "traversal": "Directory traversal not allowed",
+    "absolute": "Absolute paths not allowed",
+    "system": "System paths not allowed",
+}
+
+
 class Artifact(BaseModel):
     # Identity
     artifact_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -29,8 +56,8 @@ class Artifact(BaseModel):
     # Metadata
     framework: Optional[str] = "react"
     styling: Optional[str] = "tailwind"
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=_now)
+    updated_at: datetime = Field(default_factory=_now)
 
     # ------------------
     # Validators (Pydantic v2)
@@ -69,36 +96,20 @@ class Artifact(BaseModel):
         - etc/shadow (system directory - SECURITY)
         """
         
-        # Normalize path (resolves .., //, ./, etc.)
-        normalized = os.path.normpath(v)
-        
-        # FIX #1: Block directory traversal
-        # Examples: ../../../etc/passwd, ../../outside/project
-        if normalized.startswith('..'):
-            raise ValueError(f"Directory traversal not allowed: {v}")
-        
-        # FIX #2: Block absolute paths (Unix and Windows)
-        # Examples: /etc/passwd, C:\Windows\system32, D:\data
-        if os.path.isabs(normalized):
-            raise ValueError(f"Absolute paths not allowed: {v}")
-        
-        # FIX #3: Block system directories (defense in depth)
-        # Even if somehow a path like "etc/passwd" gets through, block it
-        forbidden_prefixes = [
-            'etc/', 'sys/', 'root/', 'proc/', 'dev/',  # Unix
-            'windows/', 'system32/', 'program files/'  # Windows (normalized to lowercase)
-        ]
-        normalized_lower = normalized.lower().replace('\\', '/')
-        if any(normalized_lower.startswith(prefix) for prefix in forbidden_prefixes):
-            raise ValueError(f"System paths not allowed: {v}")
-        
-        # FIX #4: Block paths starting with root separator
-        # Examples: \etc\passwd (Windows style), /usr/bin
-        if normalized.startswith(('/', '\\')):
-            raise ValueError(f"Paths cannot start with separator: {v}")
+        # Normalize path (resolves .., //, ./, etc.) so traversal hidden
+        # mid-path (a/../../etc) is caught by the prefix match below.
+        normalized = os.path.normpath(v).replace('\\', '/')
+
+        # Single regex match covers all four rules:
+        # FIX #1: directory traversal (../../../etc/passwd)
+        # FIX #2 / #4: absolute or separator-rooted paths (/etc/passwd, C:\Windows)
+        # FIX #3: system directories (etc/, sys/, windows/, ...)
+        bad = _BAD_PATH.match(normalized)
+        if bad:
+            raise ValueError(f"{_BAD_PATH_MESSAGES[bad.lastgroup]}: {v}")
         
-        # Return normalized version (converts backslashes to forward slashes on Windows)
-        return normalized.replace('\\', '/')
+        # Return normalized version (backslashes converted to forward slashes)
+        return normalized
 
     @field_validator("language")
     @classmethod
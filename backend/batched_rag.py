@@ -0,0 +1,128 @@
+"""
+Dynamic batching for Global RAG queries.
+
+Concurrent requests each embed and search a single query. BatchedGlobalRAG
+collects the calls that arrive within a short window (or until a batch
+fills up) and runs them as one encode call and one index search, then
+hands each caller its own row of the result.
+
+Usage:
+    from batched_rag import BatchedGlobalRAG
+
+    global_rag = BatchedGlobalRAG(GlobalRAG())
+    refs = cached_retrieve(global_rag, user_request, k=3)
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List
+
+import numpy as np
+
+from global_rag import ENCODE_BATCH_SIZE, GlobalRAG
+
+
+BATCH_WAIT_SECONDS = 0.01
+
+
+class _MicroBatcher:
+    """
+    Runs run_batch(items) -> results on a worker thread, one call per batch.
+
+    The worker blocks for the first item, then keeps collecting until
+    max_batch items are queued or max_wait has passed since that first item.
+    """
+
+    def __init__(self, run_batch: Callable[[list], list], max_batch: int, max_wait: float):
+        self._run_batch = run_batch
+        self._max_batch = max_batch
+        self._max_wait = max_wait
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker = None
+        self._worker_guard = threading.Lock()
+
+    def submit(self, item):
+        future = Future()
+        self._queue.put((item, future))
+        self._ensure_worker()
+        return future.result()
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_guard:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._loop, daemon=True)
+                self._worker.start()
+
+    def _loop(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self._max_wait
+            while len(batch) < self._max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            items = [item for item, _ in batch]
+            try:
+                results = self._run_batch(items)
+            except BaseException as exc:
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+class BatchedGlobalRAG:
+    """
+    GlobalRAG wrapper whose embed_query/search/retrieve calls are coalesced
+    across threads. Everything else (entries, ingest, ...) is forwarded to
+    the wrapped instance.
+    """
+
+    def __init__(
+        self,
+        global_rag: GlobalRAG,
+        max_batch: int = ENCODE_BATCH_SIZE,
+        max_wait: float = BATCH_WAIT_SECONDS,
+    ):
+        self._rag = global_rag
+        self._embedder = _MicroBatcher(self._embed_batch, max_batch, max_wait)
+        self._searcher = _MicroBatcher(self._search_batch, max_batch, max_wait)
+
+    def __getattr__(self, name):
+        return getattr(self._rag, name)
+
+    def embed_query(self, query: str) -> np.ndarray:
+        return self._embedder.submit(query)
+
+    def search(self, q_emb: np.ndarray, k: int = 5, tags=None):
+        return self._searcher.submit((q_emb, k, tuple(tags) if tags else None))
+
+    def retrieve(self, query: str, k: int = 5, tags=None):
+        return self.search(self.embed_query(query), k=k, tags=tags)
+
+    def _embed_batch(self, queries: List[str]) -> List[np.ndarray]:
+        embeddings = self._rag.embed_queries(queries)
+        return [embeddings[i:i + 1] for i in range(len(queries))]
+
+    def _search_batch(self, requests: list) -> list:
+        # One index search per distinct (k, tags); usually there is just one.
+        results = [None] * len(requests)
+        groups = {}
+        for i, (_, k, tags) in enumerate(requests):
+            groups.setdefault((k, tags), []).append(i)
+
+        for (k, tags), positions in groups.items():
+            q_embs = np.vstack([requests[i][0] for i in positions])
+            for i, hits in zip(positions, self._rag.search_batch(q_embs, k=k, tags=tags)):
+                results[i] = hits
+        return results
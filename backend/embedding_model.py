@@ -0,0 +1,76 @@
+"""
+Embedding model loader shared by Global RAG and State RAG.
+
+Each model is loaded once per process; every caller gets the same
+instance.
+
+MiniLM inference dominates ingest/retrieve cost, so the model is loaded
+through sentence-transformers' ONNX Runtime backend with the int8
+dynamically-quantized weights published alongside all-MiniLM-L6-v2.
+The encode() interface is unchanged.
+
+Set EMBEDDING_BACKEND=torch to force the plain FP32 PyTorch model. With
+the default (onnx), a missing onnxruntime/optimum install or an older
+sentence-transformers falls back to PyTorch with a warning.
+
+When a CUDA GPU is available the PyTorch model runs there in fp16
+instead; the int8 ONNX weights only help on CPU.
+"""
+
+import logging
+import os
+import platform
+import threading
+from functools import lru_cache
+
+from sentence_transformers import SentenceTransformer
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "onnx")
+
+_load_lock = threading.Lock()
+
+
+def _quantized_onnx_file() -> str:
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return "onnx/model_qint8_arm64.onnx"
+    return "onnx/model_quint8_avx2.onnx"
+
+
+def _cuda_available() -> bool:
+    try:
+        import torch
+    except ImportError:
+        return False
+    return torch.cuda.is_available()
+
+
+def load_embedding_model(name: str = EMBEDDING_MODEL_NAME) -> SentenceTransformer:
+    """
+    Shared sentence embedding model, int8 ONNX when available.
+    """
+    # Held across the load so concurrent first callers don't both load it
+    with _load_lock:
+        return _load_model(name)
+
+
+@lru_cache(maxsize=None)
+def _load_model(name: str) -> SentenceTransformer:
+    if _cuda_available():
+        model = SentenceTransformer(name, device="cuda")
+        model.half()
+        return model
+
+    if EMBEDDING_BACKEND == "onnx":
+        try:
+            return SentenceTransformer(
+                name,
+                backend="onnx",
+                model_kwargs={"file_name": _quantized_onnx_file()},
+            )
+        except Exception as exc:  # optional: pip install sentence-transformers[onnx]
+            logger.warning("ONNX embedding backend unavailable (%s); using PyTorch", exc)
+
+    return SentenceTransformer(name)
@@ -7,68 +7,174 @@ Supports:
 
 Usage:
     from file_lock import FileLock
-    
+
     with FileLock("/path/to/file.json"):
         # Your code here - file is locked
         with open("/path/to/file.json", "w") as f:
             json.dump(data, f)
     # Lock automatically released
+
+Recently used lock files stay open (up to _LOCK_FDS_MAX per process), so
+each acquisition only costs the lock/unlock calls. Call release_lock_files(directory)
+before deleting a directory that contains lock files.
 """
 
+import atexit
 import sys
 import os
+import threading
+from collections import OrderedDict
+from typing import IO
+
+
+def _open_lock_file(path: str):
+    """
+    Open the lock file for read/write, creating it if needed.
+
+    A single O_CREAT open never truncates a lock file another process
+    may be holding, and avoids the exists()/create/reopen race.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    return os.fdopen(fd, "r+")
+
+
+# Most recently used lock files kept open; idle ones past this are closed.
+_LOCK_FDS_MAX = 256
+
+
+class _LockEntry:
+    # flock()/msvcrt locks belong to the open file, so threads sharing the
+    # cached fd serialize on the threading.Lock before taking the OS lock.
+    # users counts holders and waiters; an entry in use is never closed.
+    __slots__ = ("file", "lock", "users")
+
+    def __init__(self, lock_file: IO):
+        self.file = lock_file
+        self.lock = threading.Lock()
+        self.users = 0
+
+
+_LOCK_FDS: "OrderedDict[str, _LockEntry]" = OrderedDict()
+_LOCK_FDS_GUARD = threading.Lock()
+
+
+def _close_idle(paths) -> None:
+    # Caller holds _LOCK_FDS_GUARD
+    for path in paths:
+        if _LOCK_FDS[path].users == 0:
+            _LOCK_FDS.pop(path).file.close()
+
+
+def _acquire_entry(path: str) -> _LockEntry:
+    with _LOCK_FDS_GUARD:
+        entry = _LOCK_FDS.get(path)
+        if entry is None:
+            entry = _LOCK_FDS[path] = _LockEntry(_open_lock_file(path))
+        else:
+            _LOCK_FDS.move_to_end(path)
+        entry.users += 1
+        excess = len(_LOCK_FDS) - _LOCK_FDS_MAX
+        if excess > 0:
+            idle = [p for p, e in _LOCK_FDS.items() if e.users == 0]
+            _close_idle(idle[:excess])
+        return entry
+
+
+def _release_entry(entry: _LockEntry) -> None:
+    with _LOCK_FDS_GUARD:
+        entry.users -= 1
+
+
+def release_lock_files(directory: str = "") -> None:
+    """
+    Close cached lock files under directory (all of them by default).
+    Lock files currently held or waited on stay open.
+    """
+    with _LOCK_FDS_GUARD:
+        if directory:
+            directory = os.path.abspath(directory)
+            prefix = directory + os.sep
+            paths = [p for p in _LOCK_FDS if p == directory or p.startswith(prefix)]
+        else:
+            paths = list(_LOCK_FDS)
+        _close_idle(paths)
+
+
+def _forget_inherited_lock_files() -> None:
+    # A forked child shares the parent's open file descriptions, and with
+    # them the parent's flock() state. Drop them and reopen on demand.
+    global _LOCK_FDS_GUARD
+    for entry in _LOCK_FDS.values():
+        entry.file.close()
+    _LOCK_FDS.clear()
+    _LOCK_FDS_GUARD = threading.Lock()
+
+
+atexit.register(release_lock_files)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_inherited_lock_files)
 
 
 class FileLock:
     """
     Context manager for cross-platform exclusive file locking.
-    
+
     Prevents race conditions when multiple processes access the same file.
     """
-    
+
     def __init__(self, filepath: str):
         """
         Args:
             filepath: Path to the file to lock (a .lock file will be created)
         """
-        self.filepath = filepath + ".lock"
+        self.filepath = os.path.abspath(filepath + ".lock")
         self.lock_file = None
-    
+        self._entry = None
+
     def __enter__(self):
         """Acquire exclusive lock"""
-        # Create lock file if it doesn't exist
-        if not os.path.exists(self.filepath):
-            open(self.filepath, 'w').close()
-        
-        if sys.platform == "win32":
-            # Windows: use msvcrt
-            import msvcrt
-            self.lock_file = open(self.filepath, "r+")
-            # Lock 1 byte at position 0
-            msvcrt.locking(self.lock_file.fileno(), msvcrt.LK_LOCK, 1)
-        else:
-            # Unix/Linux/macOS: use fcntl
-            import fcntl
-            self.lock_file = open(self.filepath, "r+")
-            # Acquire exclusive lock (blocks until available)
-            fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_EX)
-        
-        return self
-    
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        """Release lock"""
-        if self.lock_file:
+        self._entry = entry = _acquire_entry(self.filepath)
+        lock_file = entry.file
+        entry.lock.acquire()
+
+        try:
             if sys.platform == "win32":
+                # Windows: use msvcrt
                 import msvcrt
-                # Unlock 1 byte at position 0
-                msvcrt.locking(self.lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+                # Lock 1 byte at position 0
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
             else:
+                # Unix/Linux/macOS: use fcntl
                 import fcntl
-                # Release lock
-                fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_UN)
-            
-            self.lock_file.close()
-        
+                # Acquire exclusive lock (blocks until available)
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        except BaseException:
+            entry.lock.release()
+            _release_entry(entry)
+            raise
+
+        self.lock_file = lock_file
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Release lock"""
+        if self.lock_file:
+            try:
+                if sys.platform == "win32":
+                    import msvcrt
+                    # Unlock 1 byte at position 0
+                    self.lock_file.seek(0)
+                    msvcrt.locking(self.lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+                else:
+                    import fcntl
+                    # Release lock (the fd stays open for reuse)
+                    fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_UN)
+            finally:
+                self.lock_file = None
+                self._entry.lock.release()
+                _release_entry(self._entry)
+
         # Return False to propagate exceptions
         return False
 
@@ -76,47 +182,58 @@ class FileLock:
 class SharedFileLock:
     """
     Context manager for shared (read) file locking.
-    
+
     Multiple processes can hold shared locks simultaneously,
     but exclusive locks will block until all shared locks are released.
-    
+    Within one process, holders of the same lock file take turns.
+
     Note: Only supported on Unix/Linux/macOS (not Windows).
     """
-    
+
     def __init__(self, filepath: str):
-        self.filepath = filepath + ".lock"
+        self.filepath = os.path.abspath(filepath + ".lock")
         self.lock_file = None
-    
+        self._entry = None
+
     def __enter__(self):
         """Acquire shared lock"""
-        # Ensure lock file exists (needed for Windows which opens directly)
-        if not os.path.exists(self.filepath):
-            open(self.filepath, 'w').close()
-
-        if sys.platform == "win32":
-            # Windows doesn't support shared locks with msvcrt
-            # Fall back to exclusive lock
-            import msvcrt
-            self.lock_file = open(self.filepath, "r+")
-            msvcrt.locking(self.lock_file.fileno(), msvcrt.LK_LOCK, 1)
-        else:
-            # Unix: use shared lock
-            import fcntl
-            self.lock_file = open(self.filepath, "r+")
-            fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_SH)
-        
-        return self
-    
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        """Release lock"""
-        if self.lock_file:
+        self._entry = entry = _acquire_entry(self.filepath)
+        lock_file = entry.file
+        entry.lock.acquire()
+
+        try:
             if sys.platform == "win32":
+                # Windows doesn't support shared locks with msvcrt
+                # Fall back to exclusive lock
                 import msvcrt
-                msvcrt.locking(self.lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
             else:
+                # Unix: use shared lock
                 import fcntl
-                fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_UN)
-            
-            self.lock_file.close()
-        
-        return False
\ No newline at end of file
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH)
+        except BaseException:
+            entry.lock.release()
+            _release_entry(entry)
+            raise
+
+        self.lock_file = lock_file
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Release lock"""
+        if self.lock_file:
+            try:
+                if sys.platform == "win32":
+                    import msvcrt
+                    self.lock_file.seek(0)
+                    msvcrt.locking(self.lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+                else:
+                    import fcntl
+                    fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_UN)
+            finally:
+                self.lock_file = None
+                self._entry.lock.release()
+                _release_entry(self._entry)
+
+        return False
@@ -1,15 +1,66 @@
+import atexit
 import faiss
-import json
+import logging
 import os
+import platform
+import threading
 import numpy as np
-from sentence_transformers import SentenceTransformer
+from typing import Dict, List, Optional
+from pydantic import TypeAdapter
+from embedding_model import load_embedding_model
 from schemas import GlobalRAGEntry
 from file_lock import FileLock, SharedFileLock
 
 EMBEDDING_DIM = 384
+# Below this many entries exact flat search beats building/querying HNSW.
+ANN_MIN_ENTRIES = 1000
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 40
+HNSW_EF_SEARCH_MIN = 16
+ENCODE_BATCH_SIZE = 32
+BULK_ENCODE_BATCH_SIZE = 128
+# ingest appends entries right away but rewrites the FAISS index only
+# every this many inserts (and at exit); _load re-embeds any gap.
+INDEX_FLUSH_EVERY = 32
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 INDEX_PATH = os.path.join(BASE_DIR, "global_rag.index")
-DATA_PATH = os.path.join(BASE_DIR, "global_rag.json")
+# One JSON entry per line, in index order.
+DATA_PATH = os.path.join(BASE_DIR, "global_rag.jsonl")
+# Single JSON array written by older versions; read if DATA_PATH is missing.
+LEGACY_DATA_PATH = os.path.join(BASE_DIR, "global_rag.json")
+# Map flat code storage instead of reading it into RAM (FAISS >= 1.11).
+MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+
+logger = logging.getLogger(__name__)
+
+
+# Entries go straight between JSON bytes and models in pydantic-core,
+# without an intermediate dict per entry.
+_LEGACY_ENTRIES = TypeAdapter(List[GlobalRAGEntry])
+
+
+def _dumps_line(entry: GlobalRAGEntry) -> bytes:
+    return entry.model_dump_json().encode() + b"\n"
+
+
+def _check_faiss_simd():
+    """
+    Warn when FAISS was built without AVX2/AVX512 kernels on x86.
+
+    Generic builds run the distance kernels several times slower; see
+    "Slow Global RAG search" in details/SETUP_GUIDE.md.
+    """
+    if platform.machine().lower() not in ("x86_64", "amd64"):
+        return
+    options = faiss.get_compile_options().split()
+    if not any(opt.startswith(("AVX2", "AVX512")) for opt in options):
+        logger.warning(
+            "FAISS %s was built without AVX2/AVX512 (%s); vector search "
+            "will be slow. Install faiss-cpu>=1.8 or build with "
+            "-DFAISS_OPT_LEVEL=avx2/avx512.",
+            faiss.__version__,
+            " ".join(options) or "generic",
+        )
 
 
 class GlobalRAG:
@@ -21,29 +72,236 @@ class GlobalRAG:
     """
     
     def __init__(self):
-        self.model = SentenceTransformer("all-MiniLM-L6-v2")
+        _check_faiss_simd()
+        self.model = load_embedding_model()
         self.entries = []
-        self.index = faiss.IndexFlatL2(EMBEDDING_DIM)
+        self.index = self._new_flat_index()
+        self._index_mapped = False
+        self._unflushed = 0
+        self._buffers = threading.local()
+        self._reset_tags()
+        # Held while entries/index change or are searched: the instance is
+        # shared by every request thread
+        self._lock = threading.RLock()
+        # Bytes of DATA_PATH reflected in self.entries; None forces a full
+        # reload on the next refresh()
+        self._data_size: Optional[int] = 0
 
-        if os.path.exists(INDEX_PATH) and os.path.exists(DATA_PATH):
+        if os.path.exists(DATA_PATH) or (
+            os.path.exists(INDEX_PATH) and os.path.exists(LEGACY_DATA_PATH)
+        ):
             self._load()
 
+        atexit.register(self.flush)
+
+    def _embed(self, texts, batch_size: int = ENCODE_BATCH_SIZE) -> np.ndarray:
+        embeddings = self.model.encode(
+            texts, batch_size=batch_size, convert_to_numpy=True
+        ).astype("float32")
+        faiss.normalize_L2(embeddings)
+        return embeddings
+
+    def _new_flat_index(self):
+        """
+        Exact search index for stores below ANN_MIN_ENTRIES.
+
+        Embeddings are L2-normalized, so inner product == cosine similarity.
+        Vectors are stored as fp16: half the memory traffic of float32
+        per query, and unlike 8-bit it needs no training data.
+        """
+        return faiss.IndexScalarQuantizer(
+            EMBEDDING_DIM,
+            faiss.ScalarQuantizer.QT_fp16,
+            faiss.METRIC_INNER_PRODUCT,
+        )
+
+    def _migrate_index(self):
+        """
+        Indexes persisted by older versions hold float32 vectors, first
+        raw under L2 and later normalized in IndexFlatIP. Re-store them
+        normalized in the current flat index once.
+        """
+        if self.index.metric_type == faiss.METRIC_INNER_PRODUCT and not isinstance(
+            self.index, faiss.IndexFlat
+        ):
+            return
+
+        vectors = self.index.reconstruct_n(0, self.index.ntotal)
+        faiss.normalize_L2(vectors)
+        self.index = self._new_flat_index()
+        self.index.add(vectors)
+        self._index_mapped = False
+
+    def _maybe_upgrade_index(self):
+        """
+        Switch from exact flat search to an HNSW graph once the store is
+        large enough for O(log N) search to pay off. Vectors are decoded
+        from the flat index, so no re-encoding is needed.
+
+        The HNSW storage is 8-bit scalar quantized (per-dimension min/max
+        learned from the existing vectors): 4x less memory to stream per
+        query than float32.
+        """
+        if isinstance(self.index, faiss.IndexHNSW):
+            return
+        if self.index.ntotal < ANN_MIN_ENTRIES:
+            return
+
+        vectors = self.index.reconstruct_n(0, self.index.ntotal)
+        index = faiss.IndexHNSWSQ(
+            EMBEDDING_DIM,
+            faiss.ScalarQuantizer.QT_8bit,
+            HNSW_M,
+            faiss.METRIC_INNER_PRODUCT,
+        )
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.train(vectors)
+        index.add(vectors)
+        self.index = index
+        self._index_mapped = False
+
     def _load(self):
         """
         FIX: Thread-safe loading with shared lock.
         
         Multiple processes can read simultaneously, but writes will block.
         """
-        # FAISS index (no lock needed - atomic read)
-        self.index = faiss.read_index(INDEX_PATH)
+        # FAISS index (no lock needed - atomic read). Memory-mapped, so
+        # cold start doesn't copy every vector into RAM.
+        if os.path.exists(INDEX_PATH):
+            self.index = faiss.read_index(INDEX_PATH, MMAP_FLAGS)
+            self._index_mapped = True
+            self._migrate_index()
         
         # JSON data (with shared lock for thread safety)
-        with SharedFileLock(DATA_PATH):
-            with open(DATA_PATH, "r") as f:
-                raw = json.load(f)
-                self.entries = [GlobalRAGEntry(**e) for e in raw]
+        if os.path.exists(DATA_PATH):
+            with SharedFileLock(DATA_PATH):
+                with open(DATA_PATH, "rb") as f:
+                    self.entries = [
+                        GlobalRAGEntry.model_validate_json(line)
+                        for line in f
+                        if line.strip()
+                    ]
+                    self._data_size = f.tell()
+        else:
+            with SharedFileLock(LEGACY_DATA_PATH):
+                with open(LEGACY_DATA_PATH, "rb") as f:
+                    self.entries = _LEGACY_ENTRIES.validate_json(f.read())
+            # Whoever writes DATA_PATH first migrates everything to it
+            self._data_size = None
+
+        self._reset_tags()
+        self._index_tags(self.entries)
+
+        # Entries appended after the last index flush
+        missing = self.entries[self.index.ntotal:]
+        if missing:
+            self._own_index()
+            self.index.add(self._embed([e.content for e in missing]))
+            self._unflushed = len(missing)
+        self._maybe_upgrade_index()
+
+    def _own_index(self):
+        # Mapped storage is read-only; take an owned copy before adding.
+        if self._index_mapped:
+            self.index = faiss.deserialize_index(faiss.serialize_index(self.index))
+            self._index_mapped = False
+
+    def _write_index(self):
+        # Written aside and renamed into place: other processes may have
+        # the old file memory-mapped, and truncating it under them would
+        # fault their next search.
+        tmp_path = INDEX_PATH + ".tmp"
+        faiss.write_index(self.index, tmp_path)
+        os.replace(tmp_path, INDEX_PATH)
+        self._unflushed = 0
+
+    def flush(self):
+        """
+        Write the FAISS index if ingest has added vectors since the last write.
+        """
+        with self._lock:
+            if self._unflushed:
+                self._write_index()
+
+    def _append(self, entries: List[GlobalRAGEntry]):
+        """
+        Append entries to DATA_PATH: work under the lock scales with the
+        new entries instead of rewriting every entry. Caller holds
+        FileLock(DATA_PATH).
+        """
+        with open(DATA_PATH, "ab") as f:
+            f.writelines(_dumps_line(e) for e in entries)
+            f.flush()
+            os.fsync(f.fileno())
+            if self._data_size is not None:
+                self._data_size = f.tell()
+
+    def _add(self, entries: List[GlobalRAGEntry], embeddings: np.ndarray):
+        self._own_index()
+        self.index.add(embeddings)
+        self._maybe_upgrade_index()
+        self.entries.extend(entries)
+        self._index_tags(entries)
+
+    def _read_appended(self) -> bool:
+        """
+        Add entries other processes appended to DATA_PATH since we last
+        read or wrote it. Returns False, reading nothing, when the file
+        was rewritten rather than appended to and needs a full reload.
+        Caller holds self._lock and a lock on DATA_PATH.
+        """
+        with open(DATA_PATH, "rb") as f:
+            size = f.seek(0, os.SEEK_END)
+            if self._data_size is None or size < self._data_size:
+                return False
+            f.seek(self._data_size)
+            entries = [
+                GlobalRAGEntry.model_validate_json(line)
+                for line in f
+                if line.strip()
+            ]
+            self._data_size = f.tell()
+
+        if entries:
+            batch_size = BULK_ENCODE_BATCH_SIZE if len(entries) > 1 else ENCODE_BATCH_SIZE
+            self._add(entries, self._embed([e.content for e in entries], batch_size=batch_size))
+            self._unflushed += len(entries)
+        return True
+
+    def refresh(self) -> bool:
+        """
+        Pick up entries another process (e.g. the api.py ingest service)
+        wrote since this instance last read or wrote DATA_PATH. Costs one
+        stat when nothing changed. Returns True if entries were reloaded.
+        """
+        try:
+            size = os.path.getsize(DATA_PATH)
+        except OSError:
+            return False
+        if size == self._data_size:
+            return False
+
+        with self._lock:
+            count = len(self.entries)
+            with SharedFileLock(DATA_PATH):
+                appended = self._read_appended()
+            if not appended:
+                self.entries = []
+                self.index = self._new_flat_index()
+                self._index_mapped = False
+                self._unflushed = 0
+                self._reset_tags()
+                self._load()
+            return not appended or len(self.entries) != count
+
+    def compact(self):
+        """
+        Rewrite the index and the whole entry file in one go.
+        """
+        self._persist_full()
 
-    def _persist(self):
+    def _persist_full(self):
         """
         FIX: Thread-safe persistence with exclusive lock.
         
@@ -59,24 +317,70 @@ class GlobalRAG:
         """
         os.makedirs(os.path.dirname(DATA_PATH), exist_ok=True)
 
-        # FAISS index (atomic write - no lock needed)
-        faiss.write_index(self.index, INDEX_PATH)
-        
-        # JSON data (with exclusive lock)
-        with FileLock(DATA_PATH):
-            with open(DATA_PATH, "w") as f:
-                json.dump([e.dict() for e in self.entries], f, indent=2)
+        with self._lock:
+            # JSON data (with exclusive lock)
+            with FileLock(DATA_PATH):
+                # Keep entries other processes appended in the meantime
+                if os.path.exists(DATA_PATH):
+                    self._read_appended()
+
+                # FAISS index (atomic replace, no lock needed)
+                self._write_index()
+
+                with open(DATA_PATH, "wb") as f:
+                    f.writelines(_dumps_line(e) for e in self.entries)
+                    self._data_size = f.tell()
 
     def ingest(self, entry: GlobalRAGEntry):
         """
         Add new entry to Global RAG.
         
-        Thread-safe: Uses exclusive lock during persist.
+        Thread-safe: Uses exclusive lock while appending.
+        """
+        self.bulk_ingest([entry])
+
+    def bulk_ingest(self, entries: List[GlobalRAGEntry]):
+        """
+        Add many entries with one batched encode, one index add and one
+        append.
         """
-        embedding = self.model.encode([entry.content]).astype("float32")
-        self.index.add(embedding)
-        self.entries.append(entry)
-        self._persist()
+        if not entries:
+            return
+
+        batch_size = BULK_ENCODE_BATCH_SIZE if len(entries) > 1 else ENCODE_BATCH_SIZE
+        embeddings = self._embed([e.content for e in entries], batch_size=batch_size)
+
+        with self._lock:
+            if not os.path.exists(DATA_PATH):
+                # First write, or still on the legacy JSON file
+                self._add(entries, embeddings)
+                self._persist_full()
+                return
+
+            with FileLock(DATA_PATH):
+                # Entries other processes appended go first, so index rows
+                # stay in file order. If the file was rewritten instead,
+                # ours are appended and the next refresh() reloads it all.
+                if not self._read_appended():
+                    self._data_size = None
+                self._add(entries, embeddings)
+                self._append(entries)
+
+            self._unflushed += len(entries)
+            if self._unflushed >= INDEX_FLUSH_EVERY:
+                self._write_index()
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """
+        Embed a query string into a normalized (1, EMBEDDING_DIM) float32 array.
+        """
+        return self._embed([query])
+
+    def embed_queries(self, queries) -> np.ndarray:
+        """
+        Embed several queries in one encode call, one row per query.
+        """
+        return self._embed(list(queries))
 
     def retrieve(self, query: str, k: int = 5, tags=None):
         """
@@ -90,28 +394,116 @@ class GlobalRAG:
         Returns:
             List of GlobalRAGEntry objects
         """
-        # Embed query
-        q_emb = self.model.encode([query]).astype("float32")
-        
-        # Search FAISS index (returns 2x results for filtering)
-        _, indices = self.index.search(q_emb, k * 2)
-
-        # Filter and collect results
-        results = []
-        for idx in indices[0]:
-            if idx == -1:  # FAISS padding
-                continue
-            
-            entry = self.entries[idx]
-            
-            # Tag filtering
-            if tags and not set(tags).issubset(set(entry.tags)):
-                continue
-            
-            results.append(entry)
-            
-            # Stop when we have enough
-            if len(results) >= k:
-                break
-
-        return results
\ No newline at end of file
+        return self.search(self.embed_query(query), k=k, tags=tags)
+
+    def search(self, q_emb: np.ndarray, k: int = 5, tags=None):
+        """
+        Retrieve top-k entries for an already embedded query.
+
+        Split out of retrieve() so callers that cache query embeddings
+        can skip the encode step.
+        """
+        return self.search_batch(q_emb, k=k, tags=tags)[0]
+
+    def search_batch(self, q_embs: np.ndarray, k: int = 5, tags=None):
+        """
+        Retrieve top-k entries for each row of q_embs with a single
+        index search. Returns one result list per query.
+        """
+        self.refresh()
+
+        with self._lock:
+            q_bits = self._query_bits(tags) if tags else None
+            if tags and q_bits is None:
+                # A tag no entry has ever carried can't match anything.
+                return [[] for _ in range(len(q_embs))]
+
+            # HNSW search breadth scales with k; passed per call so concurrent
+            # searches don't race on a shared efSearch setting.
+            params = None
+            if isinstance(self.index, faiss.IndexHNSW):
+                params = faiss.SearchParametersHNSW(
+                    efSearch=max(HNSW_EF_SEARCH_MIN, k * 4)
+                )
+
+            # Over-fetch 2x only when tag filtering may drop hits
+            fetch = k * 2 if q_bits is not None else k
+            distances, indices = self._search_buffers(len(q_embs), fetch)
+            self.index.search(q_embs, fetch, D=distances, I=indices, params=params)
+            return [self._collect(row, k, q_bits) for row in indices]
+
+    def _search_buffers(self, n: int, fetch: int):
+        # FAISS output arrays, reused per thread while the shape repeats
+        # (it almost always does: one query, same k). _collect copies out
+        # of them before the thread's next search.
+        buffers = getattr(self._buffers, "arrays", None)
+        if buffers is None or buffers[1].shape != (n, fetch):
+            buffers = (
+                np.empty((n, fetch), dtype="float32"),
+                np.empty((n, fetch), dtype="int64"),
+            )
+            self._buffers.arrays = buffers
+        return buffers
+
+    def _collect(self, indices: np.ndarray, k: int, q_bits=None):
+        indices = indices[indices != -1]  # FAISS padding
+        if q_bits is not None:
+            entry_bits = self._tag_bits[indices]
+            indices = indices[((entry_bits & q_bits) == q_bits).all(axis=1)]
+        return [self.entries[i] for i in indices[:k]]
+
+    # ------------------
+    # Tag bitmaps
+    # ------------------
+
+    def _reset_tags(self):
+        # tag -> bit position; each entry's tags are packed into a row of
+        # uint64 words so filtering is a vectorized AND over candidates.
+        self._tag_vocab: Dict[str, int] = {}
+        self._tag_bits = np.zeros((0, 1), dtype=np.uint64)
+
+    def _index_tags(self, entries: List[GlobalRAGEntry]):
+        for entry in entries:
+            for tag in entry.tags:
+                self._tag_vocab.setdefault(tag, len(self._tag_vocab))
+
+        words = max(1, -(-len(self._tag_vocab) // 64))
+        if words > self._tag_bits.shape[1]:
+            self._tag_bits = np.pad(
+                self._tag_bits, ((0, 0), (0, words - self._tag_bits.shape[1]))
+            )
+
+        rows = np.zeros((len(entries), words), dtype=np.uint64)
+        for row, entry in zip(rows, entries):
+            for tag in entry.tags:
+                bit = self._tag_vocab[tag]
+                row[bit // 64] |= np.uint64(1 << (bit % 64))
+        self._tag_bits = np.concatenate([self._tag_bits, rows])
+
+    def _query_bits(self, tags) -> Optional[np.ndarray]:
+        """
+        Bit mask for the requested tags, or None if any tag is unknown.
+        """
+        q_bits = np.zeros(self._tag_bits.shape[1], dtype=np.uint64)
+        for tag in tags:
+            bit = self._tag_vocab.get(tag)
+            if bit is None:
+                return None
+            q_bits[bit // 64] |= np.uint64(1 << (bit % 64))
+        return q_bits
+
+
+_global_rag: Optional[GlobalRAG] = None
+_global_rag_lock = threading.Lock()
+
+
+def get_global_rag() -> GlobalRAG:
+    """
+    Process-wide GlobalRAG, built on first use. Loading the model and
+    index once lets every Orchestrator and API worker share them.
+    """
+    global _global_rag
+    with _global_rag_lock:
+        if _global_rag is None:
+            _global_rag = GlobalRAG()
+        return _global_rag
@@ -1,8 +1,10 @@
+from functools import lru_cache
 from typing import List
 from schemas import GlobalRAGEntry
 
 MAX_ENTRY_CHARS = 300
 MAX_TOTAL_CHARS = 1200
+HEADER = "GLOBAL REFERENCES (advisory):\n"
 
 
 def _truncate(text: str, limit: int) -> str:
@@ -12,6 +14,13 @@ def _truncate(text: str, limit: int) -> str:
     return text[: limit - 3].rstrip() + "..."
 
 
+@lru_cache(maxsize=1024)
+def _entry_text(title: str, content: str) -> str:
+    # Global RAG entries are few and rarely change, so the truncated
+    # title/content pair is built once per entry rather than per prompt.
+    return f"{_truncate(title, 80)}\n   {_truncate(content, MAX_ENTRY_CHARS)}"
+
+
 def format_global_rag_for_prompt(
     entries: List[GlobalRAGEntry],
 ) -> str:
@@ -23,25 +32,18 @@ def format_global_rag_for_prompt(
     if not entries:
         return ""
 
-    lines = []
+    parts = [HEADER]
     total_chars = 0
-    count = 1
-
-    for entry in entries:
-        title = _truncate(entry.title, 80)
-        content = _truncate(entry.content, MAX_ENTRY_CHARS)
 
-        block = (
-            f"{count}. {title}\n"
-            f"   {content}"
-        )
+    for count, entry in enumerate(entries, 1):
+        block = f"{count}. {_entry_text(entry.title, entry.content)}"
 
         if total_chars + len(block) > MAX_TOTAL_CHARS:
             break
 
-        lines.append(block)
+        if count > 1:
+            parts.append("\n\n")
+        parts.append(block)
         total_chars += len(block)
-        count += 1
 
-    header = "GLOBAL REFERENCES (advisory):\n"
-    return header + "\n\n".join(lines)
+    return "".join(parts)
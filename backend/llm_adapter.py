@@ -1,9 +1,108 @@
-from typing import Optional
+from typing import Dict, Iterator, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import Future
+import datetime
+import hashlib
 import os
+import threading
 import time
 from dotenv import load_dotenv
 
 
+GEMINI_MODEL = "gemini-2.5-flash"
+
+# Explicit context caching for the stable prompt prefix (system framing +
+# project state). Gemini rejects caches under ~1024 tokens, so shorter
+# prefixes are just sent inline.
+GEMINI_CACHE_TTL = datetime.timedelta(minutes=10)
+GEMINI_CACHE_MIN_CHARS = 4096
+GEMINI_CACHE_MAX_ENTRIES = 16
+
+# Completed responses keyed by prompt hash. Generation is deterministic
+# (temperature 0), so a repeated prompt can skip the network call.
+# Set LLM_CACHE_DIR to also share responses across processes (needs the
+# optional diskcache package).
+LLM_CACHE_SIZE = 1024
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR")
+
+_response_cache: "OrderedDict[bytes, str]" = OrderedDict()
+_response_cache_lock = threading.Lock()
+_disk_cache = None
+
+
+def _prompt_key(provider: str, prompt: str) -> bytes:
+    return hashlib.blake2b(
+        f"{provider}\0{prompt}".encode(), digest_size=16
+    ).digest()
+
+
+def _get_disk_cache():
+    global _disk_cache
+    if _disk_cache is None and LLM_CACHE_DIR:
+        try:
+            import diskcache
+        except ImportError:
+            raise RuntimeError("LLM_CACHE_DIR is set. Run: pip install diskcache")
+        _disk_cache = diskcache.Cache(LLM_CACHE_DIR)
+    return _disk_cache
+
+
+def _cached_response(key: bytes) -> Optional[str]:
+    with _response_cache_lock:
+        response = _response_cache.get(key)
+        if response is not None:
+            _response_cache.move_to_end(key)
+            return response
+
+    disk = _get_disk_cache()
+    return disk.get(key) if disk is not None else None
+
+
+def _store_response(key: bytes, response: str) -> None:
+    with _response_cache_lock:
+        _response_cache[key] = response
+        _response_cache.move_to_end(key)
+        while len(_response_cache) > LLM_CACHE_SIZE:
+            _response_cache.popitem(last=False)
+
+    disk = _get_disk_cache()
+    if disk is not None:
+        disk.set(key, response)
+
+
+# prompt key -> Future for a response being generated right now.
+# Concurrent identical prompts (double submits, several clients sending
+# the same request) share the first call instead of each hitting the
+# provider. The future resolves to None if that call fails or is cut
+# short, and waiters then call the provider themselves.
+_inflight: Dict[bytes, Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def _claim_inflight(key: bytes) -> Tuple[bool, Future]:
+    """
+    (True, new future) for the first caller of key, else (False, its future).
+    """
+    with _inflight_lock:
+        pending = _inflight.get(key)
+        if pending is not None:
+            return False, pending
+        pending = _inflight[key] = Future()
+        return True, pending
+
+
+def _release_inflight(key: bytes, pending: Future, response: Optional[str]) -> None:
+    with _inflight_lock:
+        _inflight.pop(key, None)
+    pending.set_result(response or None)
+
+
+# prefix hash -> (model bound to the cached content, expires_at).
+# Module-level because an adapter is built per request.
+_gemini_caches: "OrderedDict[str, tuple]" = OrderedDict()
+_gemini_caches_lock = threading.Lock()
+
+
 class LLMAdapter:
     """
     Minimal LLM transport layer with proper rate limiting and retry logic.
@@ -38,21 +137,97 @@ class LLMAdapter:
     # Public API
     # --------------------------------------------------
 
-    def generate(self, prompt: str) -> str:
+    def generate(self, prompt: str, cached_prefix: str = "") -> str:
         """
         Sends prompt to LLM and returns raw text output.
         Includes retry logic for rate limits.
+
+        cached_prefix, when given, must be a prefix of prompt that stays
+        the same across calls; Gemini serves it from a context cache.
+
+        Responses are cached by prompt, so an identical prompt is answered
+        without calling the provider again.
         """
         if self.provider == "mock":
             return self._mock_response(prompt)
 
-        if self.provider == "openai":
-            return self._openai_response(prompt)
+        key = _prompt_key(self.provider, prompt)
+        response = _cached_response(key)
+        if response is not None:
+            return response
 
-        if self.provider == "gemini":
-            return self._gemini_response_with_retry(prompt)
-        
-        raise RuntimeError("Invalid LLM provider state")
+        # An identical prompt already on the wire: wait for its answer
+        leader, pending = _claim_inflight(key)
+        if not leader:
+            response = pending.result()
+            if response is not None:
+                return response
+
+        try:
+            if self.provider == "openai":
+                response = self._openai_response(prompt, cached_prefix=cached_prefix)
+
+            elif self.provider == "gemini":
+                response = self._gemini_response_with_retry(prompt, cached_prefix=cached_prefix)
+
+            else:
+                raise RuntimeError("Invalid LLM provider state")
+        finally:
+            if leader:
+                _release_inflight(key, pending, response)
+
+        if response:
+            _store_response(key, response)
+        return response
+
+    def stream(self, prompt: str, cached_prefix: str = "") -> Iterator[str]:
+        """
+        Like generate(), but yields the output in chunks as the provider
+        decodes it. The full text is added to the response cache once the
+        stream completes; a cached response comes back as one chunk.
+        """
+        if self.provider == "mock":
+            yield self._mock_response(prompt)
+            return
+
+        key = _prompt_key(self.provider, prompt)
+        response = _cached_response(key)
+        if response is not None:
+            yield response
+            return
+
+        leader, pending = _claim_inflight(key)
+        if not leader:
+            response = pending.result()
+            if response is not None:
+                yield response
+                return
+
+        try:
+            if self.provider == "openai":
+                chunks = self._openai_stream(prompt, cached_prefix=cached_prefix)
+
+            elif self.provider == "gemini":
+                chunks = self._gemini_stream(prompt, cached_prefix=cached_prefix)
+
+            else:
+                raise RuntimeError("Invalid LLM provider state")
+
+            parts = []
+            for chunk in chunks:
+                if chunk:
+                    parts.append(chunk)
+                    yield chunk
+
+            response = "".join(parts)
+        finally:
+            # Also runs when the consumer stops early; waiters then make
+            # their own call
+            if leader:
+                _release_inflight(key, pending, response)
+
+        if response:
+            _store_response(key, response)
 
     # --------------------------------------------------
     # Provider initializers
@@ -91,8 +266,8 @@ class LLMAdapter:
         # - gemini-flash-latest (alias to latest flash)
         # - gemini-pro-latest (alias to latest pro)
         
-        self.gemini_model = genai.GenerativeModel("gemini-2.5-flash")
-        print(f"✅ Using Gemini model: gemini-2.5-flash")
+        self.gemini_model = genai.GenerativeModel(GEMINI_MODEL)
+        print(f"✅ Using Gemini model: {GEMINI_MODEL}")
 
     # --------------------------------------------------
     # Providers
@@ -117,7 +292,20 @@ class LLMAdapter:
             "}\n"
         )
 
-    def _openai_response(self, prompt: str) -> str:
+    def _openai_extra_body(self, prompt: str, cached_prefix: str) -> Optional[dict]:
+        """
+        OpenAI caches long prompt prefixes automatically; a key derived
+        from the stable prefix routes repeats to the same cache.
+        """
+        if cached_prefix and prompt.startswith(cached_prefix):
+            return {
+                "prompt_cache_key": hashlib.blake2b(
+                    cached_prefix.encode(), digest_size=16
+                ).hexdigest()
+            }
+        return None
+
+    def _openai_response(self, prompt: str, cached_prefix: str = "") -> str:
         """OpenAI with updated API (v1.0+)"""
         response = self.openai_client.chat.completions.create(
             model="gpt-4o-mini",  # Cheaper, faster model
@@ -126,10 +314,93 @@ class LLMAdapter:
                 {"role": "user", "content": prompt},
             ],
             temperature=0,
+            extra_body=self._openai_extra_body(prompt, cached_prefix),
         )
         return response.choices[0].message.content
 
-    def _gemini_response_with_retry(self, prompt: str, max_retries: int = 3) -> str:
+    def _openai_stream(self, prompt: str, cached_prefix: str = "") -> Iterator[str]:
+        stream = self.openai_client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": "You are a stateless code generator."},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=0,
+            extra_body=self._openai_extra_body(prompt, cached_prefix),
+            stream=True,
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def _gemini_cached_model(self, prefix: str):
+        """
+        Model bound to a context cache holding prefix, or None if the
+        prefix is too short or the cache can't be created. A failed
+        create is cached like a model until its TTL expires.
+        """
+        if len(prefix) < GEMINI_CACHE_MIN_CHARS:
+            return None
+
+        key = hashlib.sha256(prefix.encode()).hexdigest()
+        now = time.monotonic()
+        with _gemini_caches_lock:
+            entry = _gemini_caches.get(key)
+            if entry is not None and entry[1] > now:
+                _gemini_caches.move_to_end(key)
+                return entry[0]
+
+        try:
+            cache = self.genai.caching.CachedContent.create(
+                model=f"models/{GEMINI_MODEL}",
+                contents=[prefix],
+                ttl=GEMINI_CACHE_TTL,
+            )
+            model = self.genai.GenerativeModel.from_cached_content(cached_content=cache)
+        except Exception as e:
+            print(f"⚠️  Gemini context cache unavailable, sending full prompt: {e}")
+            model = None
+
+        # Refresh a little before the server-side TTL runs out
+        expires_at = now + GEMINI_CACHE_TTL.total_seconds() * 0.9
+        with _gemini_caches_lock:
+            _gemini_caches[key] = (model, expires_at)
+            _gemini_caches.move_to_end(key)
+            while len(_gemini_caches) > GEMINI_CACHE_MAX_ENTRIES:
+                _gemini_caches.popitem(last=False)
+        return model
+
+    def _gemini_model_for(self, prompt: str, cached_prefix: str = ""):
+        """
+        (model, contents) for a Gemini call: the model bound to a context
+        cache of cached_prefix plus the rest of the prompt when a cache
+        is available, else the plain model and the whole prompt.
+        """
+        if cached_prefix and prompt.startswith(cached_prefix):
+            cached_model = self._gemini_cached_model(cached_prefix)
+            if cached_model is not None:
+                return cached_model, prompt[len(cached_prefix):]
+        return self.gemini_model, prompt
+
+    def _gemini_stream(self, prompt: str, cached_prefix: str = "") -> Iterator[str]:
+        model, contents = self._gemini_model_for(prompt, cached_prefix)
+        response = model.generate_content(
+            contents,
+            generation_config={
+                "temperature": 0,
+                "max_output_tokens": 2048,
+            },
+            stream=True,
+        )
+        for chunk in response:
+            # Chunks without text parts (safety/finish metadata) carry
+            # no output
+            if chunk.parts:
+                yield chunk.text
+
+    def _gemini_response_with_retry(
+        self, prompt: str, max_retries: int = 3, cached_prefix: str = ""
+    ) -> str:
         """
         Gemini with exponential backoff retry logic for rate limits
         
@@ -138,11 +409,12 @@ class LLMAdapter:
         - 1 million tokens per minute (TPM)
         - 1,500 requests per day (RPD)
         """
+        model, contents = self._gemini_model_for(prompt, cached_prefix)
         
         for attempt in range(max_retries):
             try:
-                response = self.gemini_model.generate_content(
-                    prompt,
+                response = model.generate_content(
+                    contents,
                     generation_config={
                         "temperature": 0,
                         "max_output_tokens": 2048,  # Reduced from 4096 to save quota
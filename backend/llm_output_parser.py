@@ -1,5 +1,5 @@
 import re
-from typing import List
+from typing import Iterable, Iterator, List
 
 from validator import ProposedArtifact
 
@@ -8,7 +8,18 @@ class LLMOutputParseError(Exception):
     """Raised when LLM output is malformed or ambiguous."""
 
 
-FILE_HEADER_REGEX = re.compile(r"^FILE:\s*(.+)$", re.MULTILINE)
+FILE_HEADER_REGEX = re.compile(r"^FILE:\s*(.+)$")
+
+# Unknown or missing extensions default to "tsx"
+_EXT_LANGUAGE = {
+    "tsx": "tsx",
+    "ts": "ts",
+    "jsx": "js",
+    "js": "js",
+    "css": "css",
+    "json": "json",
+    "html": "html",
+}
 
 
 def parse_llm_output(raw: str) -> List[ProposedArtifact]:
@@ -27,66 +38,97 @@ def parse_llm_output(raw: str) -> List[ProposedArtifact]:
     if not raw or not raw.strip():
         raise LLMOutputParseError("LLM output is empty")
 
-    matches = list(FILE_HEADER_REGEX.finditer(raw))
+    return list(iter_llm_output([raw]))
+
+
+def iter_llm_output(chunks: Iterable[str]) -> Iterator[ProposedArtifact]:
+    """
+    Incremental parse_llm_output over streamed text.
+
+    Each file is yielded as soon as the next FILE header (or the end of
+    the stream) closes it, so callers can act on early files while the
+    LLM is still writing later ones. A header must sit on one line.
+    """
+    file_path = None
+    content: List[str] = []
+    # Pieces of the current, unterminated line. Streams arrive a few
+    # tokens at a time; re-concatenating a long line on every chunk
+    # would be quadratic in its length.
+    partial: List[str] = []
+    seen_text = False
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        seen_text = seen_text or not chunk.isspace()
+
+        if "\n" not in chunk:
+            partial.append(chunk)
+            continue
+        partial.append(chunk)
+        lines = "".join(partial).split("\n")
+        partial = [lines.pop()]
+
+        for line in lines:
+            match = FILE_HEADER_REGEX.match(line)
+            if match is None:
+                if file_path is not None:
+                    content.append(line)
+                continue
+
+            # Each header closes the previous file's content.
+            if file_path is not None:
+                yield _make_artifact(file_path, "\n".join(content))
+            file_path = _header_path(match)
+            content = []
+
+    tail = "".join(partial)
+    match = FILE_HEADER_REGEX.match(tail)
+    if match is not None:
+        if file_path is not None:
+            yield _make_artifact(file_path, "\n".join(content))
+        file_path = _header_path(match)
+        content = []
+    elif file_path is not None:
+        content.append(tail)
+
+    if not seen_text:
+        raise LLMOutputParseError("LLM output is empty")
 
-    if not matches:
+    if file_path is None:
         raise LLMOutputParseError("No FILE headers found in LLM output")
 
-    artifacts: List[ProposedArtifact] = []
-    for i, match in enumerate(matches):
-        file_path = match.group(1).strip()
+    yield _make_artifact(file_path, "\n".join(content))
+
 
-        # Normalize JSX → TSX
-        if file_path.endswith(".jsx"):
-            file_path = file_path[:-4] + ".tsx"
-        
-        if not file_path:
-            raise LLMOutputParseError("Empty file path in FILE header")
+def _header_path(match: "re.Match") -> str:
+    file_path = match.group(1).strip()
 
-        content_start = match.end()
+    # Normalize JSX → TSX
+    if file_path.endswith(".jsx"):
+        file_path = file_path[:-4] + ".tsx"
 
-        if i + 1 < len(matches):
-            content_end = matches[i + 1].start()
-        else:
-            content_end = len(raw)
+    if not file_path:
+        raise LLMOutputParseError("Empty file path in FILE header")
 
-        content = raw[content_start:content_end].strip()
+    return file_path
 
-        if not content:
-            raise LLMOutputParseError(
-                f"Empty content for file: {file_path}"
-            )
 
-        language = _infer_language(file_path)
+def _make_artifact(file_path: str, content: str) -> ProposedArtifact:
+    content = content.strip()
 
-        artifacts.append(
-            ProposedArtifact(
-                file_path=file_path,
-                content=content,
-                language=language,
-            )
+    if not content:
+        raise LLMOutputParseError(
+            f"Empty content for file: {file_path}"
         )
 
-    return artifacts
+    return ProposedArtifact(
+        file_path=file_path,
+        content=content,
+        language=_infer_language(file_path),
+    )
 
 
 def _infer_language(file_path: str) -> str:
-    file_path = file_path.lower()
-
-    if file_path.endswith(".tsx"):
-        return "tsx"
-    if file_path.endswith(".ts"):
-        return "ts"
-    if file_path.endswith(".jsx"):
-        return "js"
-    if file_path.endswith(".js"):
-        return "js"
-    if file_path.endswith(".css"):
-        return "css"
-    if file_path.endswith(".json"):
-        return "json"
-    if file_path.endswith(".html"):
-        return "html"
-
-    return "tsx"
-
+    _, dot, ext = file_path.rpartition(".")
+    return _EXT_LANGUAGE.get(ext.lower(), "tsx") if dot else "tsx"
@@ -1,17 +1,89 @@
-from typing import Callable, List, Optional
+from typing import Callable, Dict, Iterator, List, Optional
+import io
+import logging
+import os
+import threading
 import time
+import random
 import re
 from state_rag_manager import StateRAGManager
-from global_rag import GlobalRAG
-from validator import Validator
+from global_rag import GlobalRAG, get_global_rag
+from query_cache import cached_retrieve
+from semantic_cache import context_key, semantic_cache
+from validator import ProposedArtifact, Validator, allowed_path_set
 from artifact import Artifact
 from state_rag_enums import ArtifactSource
 from state_rag_enums import ArtifactType
 from llm_adapter import LLMAdapter
-from llm_output_parser import parse_llm_output
+from llm_output_parser import iter_llm_output, parse_llm_output
 from runtime_validator import validate_runtime
 from node_registry_manager import NodeRegistryManager
 from tailwind_utils import infer_tailwind_group
+
+_LAYOUT_SUFFIXES = ("app.tsx", "app.js", "main.tsx", "main.js")
+LLM_RETRY_MAX_DELAY = 30
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+# Set LLM_STREAMING=0 to wait for the whole response before parsing
+LLM_STREAMING = os.getenv("LLM_STREAMING", "1") != "0"
+
+logger = logging.getLogger(__name__)
+
+# Per-provider "don't call before" deadlines (time.monotonic()), shared by
+# every Orchestrator so one caller's rate limit holds back the others too.
+_llm_cooldown_until: dict = {}
+_llm_cooldown_lock = threading.Lock()
+
+
+def _retry_after_seconds(exc: Exception) -> Optional[float]:
+    """
+    Retry-After from the provider's HTTP response, if the error carries one.
+    """
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _wait_for_llm_cooldown(provider: str) -> None:
+    with _llm_cooldown_lock:
+        wait = _llm_cooldown_until.get(provider, 0.0) - time.monotonic()
+    if wait > 0:
+        time.sleep(wait)
+
+
+def _start_llm_cooldown(provider: str, exc: Exception, attempt: int, max_retries: int) -> None:
+    delay = _retry_after_seconds(exc)
+    if delay is None:
+        delay = min(LLM_RETRY_MAX_DELAY, 2 ** attempt + random.random())
+    logger.warning(
+        "LLM call failed (%s); retry %d/%d in %.1fs",
+        exc, attempt + 2, max_retries, delay,
+    )
+    with _llm_cooldown_lock:
+        until = time.monotonic() + delay
+        if until > _llm_cooldown_until.get(provider, 0.0):
+            _llm_cooldown_until[provider] = until
+
+_SYSTEM_SECTION = (
+    "You are an AI website builder.\n"
+    "You are stateless.\n"
+    "PROJECT STATE is authoritative.\n"
+    "GLOBAL REFERENCES are advisory.\n"
+    "Modify only explicitly allowed files.\n"
+    "Output full updated files only.\n\n"
+)
+
+_OUTPUT_SECTION = (
+    "\nOUTPUT FORMAT:\n"
+    "FILE: <file_path>\n"
+    "<full file content>\n"
+)
+
+
 class Orchestrator:
     """
     Central execution controller.
@@ -38,56 +110,66 @@ class Orchestrator:
         global_rag: Optional[GlobalRAG] = None,
     ):
         self.state_rag = state_rag or StateRAGManager(project_id=project_id)
-        self.global_rag = global_rag or GlobalRAG()
+        self.global_rag = global_rag or get_global_rag()
         self.validator = Validator()
         self.llm = LLMAdapter(provider=llm_provider)
         self.project_id = project_id 
+    def _build_stable_prefix(self, active_artifacts) -> str:
+        """
+        System framing + project state. Identical across requests until
+        the project changes, so providers can cache it as a prompt prefix.
+        """
+        buf = io.StringIO()
+        write = buf.write
+        write(_SYSTEM_SECTION)
+        write("PROJECT STATE (AUTHORITATIVE):\n")
+
+        # Path order, not retrieval order, so the same project state
+        # always renders to the same bytes.
+        for a in sorted(active_artifacts, key=lambda a: a.file_path):
+            write("\nFILE: ")
+            write(a.file_path)
+            write("\n")
+            write(a.content)
+            write("\n")
+
+        return buf.getvalue()
+
     def _build_prompt(
         self,
         active_artifacts,
         global_refs,
         user_request,
-        allowed_paths
+        allowed_paths,
+        stable_prefix: Optional[str] = None,
+        lock_section: Optional[str] = None,
     ):
-        system_section = (
-            "You are an AI website builder.\n"
-            "You are stateless.\n"
-            "PROJECT STATE is authoritative.\n"
-            "GLOBAL REFERENCES are advisory.\n"
-            "Modify only explicitly allowed files.\n"
-            "Output full updated files only.\n\n"
-        )
+        if stable_prefix is None:
+            stable_prefix = self._build_stable_prefix(active_artifacts)
 
-        state_section = "PROJECT STATE (AUTHORITATIVE):\n"
-        for a in active_artifacts:
-            state_section += f"\nFILE: {a.file_path}\n{a.content}\n"
+        if lock_section is None:
+            lock_section = self._build_lock_section(allowed_paths)
 
-        lock_section = self._build_lock_section(allowed_paths)
+        # Artifact contents can run to hundreds of KB; writing every piece
+        # into one buffer copies each once instead of on every +=.
+        buf = io.StringIO()
+        write = buf.write
+        write(stable_prefix)
+        write(lock_section)
 
-        global_section = "GLOBAL REFERENCES (ADVISORY):\n"
+        write("GLOBAL REFERENCES (ADVISORY):\n")
         for ref in global_refs:
-            global_section += f"\n{ref}\n"
-
-        allowed_section = "ALLOWED FILES:\n"
-        allowed_section += "\n".join(allowed_paths)
+            write(f"\n{ref}\n")
 
-        user_section = f"\nUSER REQUEST:\n{user_request}\n"
+        write("ALLOWED FILES:\n")
+        write("\n".join(allowed_paths))
 
-        output_section = (
-            "\nOUTPUT FORMAT:\n"
-            "FILE: <file_path>\n"
-            "<full file content>\n"
-        )
+        write("\nUSER REQUEST:\n")
+        write(user_request)
+        write("\n")
+        write(_OUTPUT_SECTION)
 
-        return (
-            system_section
-            + state_section
-            + lock_section
-            + global_section
-            + allowed_section
-            + user_section
-            + output_section
-        )
+        return buf.getvalue()
 
     # --------------------------------------------------
     # Public API
@@ -115,6 +197,8 @@ class Orchestrator:
             user_query=user_request
         )
         print("Injected artifacts:", [a.file_path for a in active_artifacts])
+        # retrieve() only returns active versions, one per path
+        active_lookup = {a.file_path: a for a in active_artifacts}
 
 
         if event_callback:
@@ -126,54 +210,41 @@ class Orchestrator:
         if event_callback:
             event_callback("authority_prevalidated", None)
 
-        # 2. Retrieve advisory global knowledge
-        if event_callback:
-            event_callback("global_rag_retrieval_started", None)
-        global_refs = self.global_rag.retrieve(
-            query=user_request,
-            k=3
-        )
-        if event_callback:
-            event_callback("global_rag_retrieval_completed", {"count": len(global_refs)})
-
-        # 3. Build strict prompt
-        if event_callback:
-            event_callback("prompt_build_started", None)
-        prompt = self._build_prompt(
-            user_request=user_request,
-            active_artifacts=active_artifacts,
-            global_refs=global_refs,
-            allowed_paths=allowed_paths,
+        # Near-duplicate request against the same prompt context: reuse
+        # the earlier LLM proposals and skip steps 2-5.
+        stable_prefix = self._build_stable_prefix(active_artifacts)
+        lock_section = self._build_lock_section(allowed_paths)
+        cache_key = context_key(
+            stable_prefix,
+            lock_section,
+            str(len(self.global_rag.entries)),
+            *allowed_paths,
         )
-        if event_callback:
-            event_callback("prompt_build_completed", None)
+        query_embedding = self.global_rag.embed_query(user_request)
+        proposed = semantic_cache.lookup(cache_key, query_embedding)
+        cache_hit = proposed is not None
 
-        print("\n" + "="*80)
-        print("FINAL LLM PROMPT")
-        print("="*80)
-        print(prompt)
-        print("="*80 + "\n")
-
-        # 4. Invoke LLM (stateless) with retry logic
-        if event_callback:
-            event_callback("llm_call_started", None)
-        raw_output = self._llm_generate_with_retry(prompt)
-        if event_callback:
-            event_callback("llm_call_completed", None)
-        print("RAW LLM OUTPUT:")
-        print(raw_output)
-
-        # 5. Parse LLM output (strict contract)
-        proposed = parse_llm_output(raw_output)
-        if event_callback:
-            event_callback("llm_output_parsed", {"count": len(proposed)})
+        if cache_hit:
+            if event_callback:
+                event_callback("semantic_cache_hit", {"count": len(proposed)})
+        else:
+            proposed = self._propose_changes(
+                user_request=user_request,
+                active_artifacts=active_artifacts,
+                active_lookup=active_lookup,
+                allowed_paths=allowed_paths,
+                stable_prefix=stable_prefix,
+                lock_section=lock_section,
+                query_embedding=query_embedding,
+                event_callback=event_callback,
+            )
 
         # 6. Validate proposed changes
         if event_callback:
             event_callback("validation_started", None)
-        result = self.validator.validate(
+        result = self.validator.validate_lookup(
             proposed=proposed,
-            active_artifacts=active_artifacts,
+            active_lookup=active_lookup,
             allowed_paths=allowed_paths,
         )
         if event_callback:
@@ -186,7 +257,7 @@ class Orchestrator:
 
         if runtime_validate:
             runtime_artifacts = self._build_runtime_artifacts(
-                active_artifacts=active_artifacts,
+                active_lookup=active_lookup,
                 proposed=result.artifacts,
             )
             ok, errors = validate_runtime(runtime_artifacts)
@@ -255,10 +326,7 @@ class Orchestrator:
 
 
         for p in result.artifacts:
-            old = next(
-                (a for a in active_artifacts if a.file_path == p.file_path),
-                None
-            )
+            old = active_lookup.get(p.file_path)
 
             if old:
                 self._enforce_node_locks(
@@ -276,10 +344,7 @@ class Orchestrator:
         committed = []
 
         for p in result.artifacts:
-            old = next(
-                (a for a in active_artifacts if a.file_path == p.file_path),
-                None
-            )
+            old = active_lookup.get(p.file_path)
 
             # Preserve user authority if user explicitly allowed the edit
             if old and old.source == ArtifactSource.user_modified:
@@ -305,6 +370,10 @@ class Orchestrator:
                 registry.registry[fp] = {}
             registry._save()
 
+        # Only proposals the LLM just produced: a hit is already cached
+        if not cache_hit:
+            semantic_cache.store(cache_key, query_embedding, proposed)
+
         if event_callback:
             event_callback("commit_completed", {"count": len(committed)})
         return committed, active_artifacts
@@ -316,6 +385,82 @@ class Orchestrator:
     # Helpers
     # --------------------------------------------------
 
+    def _propose_changes(
+        self,
+        user_request: str,
+        active_artifacts: List[Artifact],
+        active_lookup: Dict[str, Artifact],
+        allowed_paths: List[str],
+        stable_prefix: str,
+        lock_section: str,
+        query_embedding=None,
+        event_callback: Optional[Callable[[str, Optional[dict]], None]] = None,
+    ):
+        """
+        Steps 2-5 of handle_request: Global RAG retrieval, prompt build,
+        LLM call and parsing into proposed artifacts. query_embedding is
+        the request's Global RAG embedding when the caller already has it.
+        """
+        # 2. Retrieve advisory global knowledge
+        if event_callback:
+            event_callback("global_rag_retrieval_started", None)
+        global_refs = cached_retrieve(
+            self.global_rag,
+            query=user_request,
+            k=3,
+            query_embedding=query_embedding,
+        )
+        if event_callback:
+            event_callback("global_rag_retrieval_completed", {"count": len(global_refs)})
+
+        # 3. Build strict prompt
+        if event_callback:
+            event_callback("prompt_build_started", None)
+        prompt = self._build_prompt(
+            user_request=user_request,
+            active_artifacts=active_artifacts,
+            global_refs=global_refs,
+            allowed_paths=allowed_paths,
+            stable_prefix=stable_prefix,
+            lock_section=lock_section,
+        )
+        if event_callback:
+            event_callback("prompt_build_completed", None)
+
+        print("\n" + "="*80)
+        print("FINAL LLM PROMPT")
+        print("="*80)
+        print(prompt)
+        print("="*80 + "\n")
+
+        # 4. Invoke LLM (stateless) with retry logic
+        if event_callback:
+            event_callback("llm_call_started", None)
+        if LLM_STREAMING:
+            # 5. Parse (and pre-validate) files while the LLM is still decoding
+            proposed = self._stream_proposals(
+                prompt,
+                cached_prefix=stable_prefix,
+                active_lookup=active_lookup,
+                allowed_paths=allowed_paths,
+            )
+            if event_callback:
+                event_callback("llm_call_completed", None)
+        else:
+            raw_output = self._llm_generate_with_retry(prompt, cached_prefix=stable_prefix)
+            if event_callback:
+                event_callback("llm_call_completed", None)
+            print("RAW LLM OUTPUT:")
+            print(raw_output)
+
+            # 5. Parse LLM output (strict contract)
+            proposed = parse_llm_output(raw_output)
+        if event_callback:
+            event_callback("llm_output_parsed", {"count": len(proposed)})
+
+        return proposed
+
+
     def _pre_validate_authority(
         self,
         active_artifacts: List[Artifact],
@@ -340,10 +485,11 @@ class Orchestrator:
         if "*" in allowed_paths:
             return
 
+        allowed_set = set(allowed_paths)
         user_protected = [
             a for a in active_artifacts
             if a.source == ArtifactSource.user_modified
-            and a.file_path not in allowed_paths
+            and a.file_path not in allowed_set
         ]
         
         if user_protected:
@@ -358,20 +504,89 @@ class Orchestrator:
     def _llm_generate_with_retry(
         self,
         prompt: str,
-        max_retries: int = 3,
+        max_retries: int = LLM_MAX_RETRIES,
+        cached_prefix: str = "",
     ) -> str:
         """
-        Calls LLM with simple retry logic.
+        Calls LLM with exponential backoff (jittered, capped) between attempts.
+
+        A failure puts the provider in cooldown for the retry delay (or the
+        provider's Retry-After), and every call waits out an active cooldown
+        before going out, instead of piling onto a rate-limited API.
+        """
+        provider = self.llm.provider
+        for attempt in range(max_retries):
+            _wait_for_llm_cooldown(provider)
+            try:
+                return self.llm.generate(prompt, cached_prefix=cached_prefix)
+            except Exception as exc:
+                if attempt == max_retries - 1:
+                    raise
+                _start_llm_cooldown(provider, exc, attempt, max_retries)
+
+    def _llm_stream_with_retry(
+        self,
+        prompt: str,
+        max_retries: int = LLM_MAX_RETRIES,
+        cached_prefix: str = "",
+    ) -> Iterator[str]:
+        """
+        Streaming _llm_generate_with_retry. Only failures before the first
+        chunk are retried; once output has been handed out, errors propagate.
         """
-        attempt = 0
-        while attempt < max_retries:
+        provider = self.llm.provider
+        for attempt in range(max_retries):
+            _wait_for_llm_cooldown(provider)
+            chunks = self.llm.stream(prompt, cached_prefix=cached_prefix)
             try:
-                return self.llm.generate(prompt)
-            except Exception:
-                attempt += 1
-                if attempt >= max_retries:
+                first = next(chunks, None)
+            except Exception as exc:
+                if attempt == max_retries - 1:
                     raise
-                time.sleep(2 ** attempt)
+                _start_llm_cooldown(provider, exc, attempt, max_retries)
+                continue
+
+            if first is not None:
+                yield first
+                yield from chunks
+            return
+
+    def _stream_proposals(
+        self,
+        prompt: str,
+        cached_prefix: str,
+        active_lookup: Dict[str, Artifact],
+        allowed_paths: List[str],
+    ) -> List[ProposedArtifact]:
+        """
+        Parses files out of the LLM stream as they complete and runs the
+        per-file validation rules on each, so a rejected file stops the
+        generation instead of waiting for the rest of the output.
+        """
+        allowed = allowed_path_set(allowed_paths)
+        raw_parts: List[str] = []
+
+        def chunks():
+            for chunk in self._llm_stream_with_retry(prompt, cached_prefix=cached_prefix):
+                raw_parts.append(chunk)
+                yield chunk
+
+        stream = chunks()
+        proposed = []
+        try:
+            for p in iter_llm_output(stream):
+                result = self.validator.validate_single(p, active_lookup, allowed)
+                if not result.ok:
+                    raise RuntimeError(
+                        f"Validation failed: {result.reason}"
+                    )
+                proposed.append(p)
+        finally:
+            stream.close()
+            print("RAW LLM OUTPUT:")
+            print("".join(raw_parts))
+
+        return proposed
 
     def _infer_type(self, file_path: str):
         path = file_path.lower()
@@ -382,26 +597,16 @@ class Orchestrator:
         if "src/pages/" in path:
             return ArtifactType.page
 
-        if path.endswith("app.tsx") or path.endswith("app.js"):
-            return ArtifactType.layout
-
-        if path.endswith("main.tsx") or path.endswith("main.js"):
+        if path.endswith(_LAYOUT_SUFFIXES):
             return ArtifactType.layout
 
-        if (
-            path.endswith(".config.js")
-            or path.endswith(".config.ts")
-            or "config" in path
-            or path.endswith("package.json")
-            or path.endswith("vite.config.ts")
-            or path.endswith("tailwind.config.js")
-        ):
+        # Covers *.config.js/ts, vite.config.ts and tailwind.config.js
+        if "config" in path or path.endswith("package.json"):
             return ArtifactType.config
 
         return ArtifactType.component
-   
-    def _build_runtime_artifacts(self, active_artifacts, proposed):
-        active_lookup = {a.file_path: a for a in active_artifacts}
+
+    def _build_runtime_artifacts(self, active_lookup, proposed):
         merged = dict(active_lookup)
 
         for p in proposed:
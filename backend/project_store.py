@@ -1,5 +1,6 @@
 import json
 import os
+import re
 from datetime import datetime
 from typing import Dict, List, Optional
 
@@ -8,28 +9,126 @@ from file_lock import FileLock
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECTS_DIR = os.path.join(BASE_DIR, "projects")
+
+# Each project's metadata lives in projects/<id>/meta.json; the index is an
+# append-only log of create/delete events that fixes the listing order.
+# Mutating one project never rewrites (or locks) the others.
+PROJECT_INDEX_FILE = os.path.join(PROJECTS_DIR, "_index.jsonl")
+
+# Pre-sharding single-file store, migrated on first use
 PROJECTS_FILE = os.path.join(PROJECTS_DIR, "projects.json")
 
+# Project ids become directory names. Anything that could step outside
+# PROJECTS_DIR (separators, "..") is refused before a path is built.
+_PROJECT_ID = re.compile(r"[A-Za-z0-9_-]+")
+
+_store_ready = False
+
+
+def is_valid_project_id(project_id: str) -> bool:
+    return isinstance(project_id, str) and _PROJECT_ID.fullmatch(project_id) is not None
+
+
+def _meta_path(project_id: str) -> str:
+    if not is_valid_project_id(project_id):
+        raise ValueError(f"Invalid project id: {project_id!r}")
+    return os.path.join(PROJECTS_DIR, project_id, "meta.json")
 
-def _ensure_projects_file() -> None:
+
+def _ensure_store() -> None:
+    # Checked once per process; the index is only ever appended or replaced.
+    global _store_ready
+    if _store_ready:
+        return
     os.makedirs(PROJECTS_DIR, exist_ok=True)
-    if not os.path.exists(PROJECTS_FILE):
-        with open(PROJECTS_FILE, "w") as f:
-            json.dump([], f, indent=2)
+    if not os.path.exists(PROJECT_INDEX_FILE):
+        with FileLock(PROJECT_INDEX_FILE):
+            if not os.path.exists(PROJECT_INDEX_FILE):
+                _migrate_projects_file()
+    _store_ready = True
 
 
-def _load_projects() -> List[Dict]:
-    _ensure_projects_file()
-    with FileLock(PROJECTS_FILE):
-        with open(PROJECTS_FILE, "r") as f:
+def _migrate_projects_file() -> None:
+    projects = []
+    if os.path.exists(PROJECTS_FILE):
+        with FileLock(PROJECTS_FILE):
+            with open(PROJECTS_FILE, "r") as f:
+                projects = json.load(f)
+
+    for project in projects:
+        _write_meta(project)
+    _write_json_atomic(
+        PROJECT_INDEX_FILE,
+        "".join(_index_line("create", p["project_id"]) for p in projects),
+    )
+
+    if os.path.exists(PROJECTS_FILE):
+        os.replace(PROJECTS_FILE, PROJECTS_FILE + ".migrated")
+
+
+def _write_json_atomic(path: str, text: str) -> None:
+    # Write-then-rename so readers never see a half-written file
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _write_meta(project: Dict) -> None:
+    path = _meta_path(project["project_id"])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _write_json_atomic(path, json.dumps(project, indent=2))
+
+
+def _read_meta(project_id: str) -> Optional[Dict]:
+    if not is_valid_project_id(project_id):
+        return None
+    try:
+        with open(_meta_path(project_id), "r") as f:
             return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _index_line(op: str, project_id: str) -> str:
+    return json.dumps({"op": op, "project_id": project_id}) + "\n"
 
 
-def _save_projects(projects: List[Dict]) -> None:
-    _ensure_projects_file()
-    with FileLock(PROJECTS_FILE):
-        with open(PROJECTS_FILE, "w") as f:
-            json.dump(projects, f, indent=2)
+def _append_index(op: str, project_id: str) -> None:
+    with FileLock(PROJECT_INDEX_FILE):
+        with open(PROJECT_INDEX_FILE, "a") as f:
+            f.write(_index_line(op, project_id))
+
+
+def _load_projects() -> List[Dict]:
+    """
+    All projects in creation order, rebuilt from the index. Folds delete
+    events out of the index while it has it locked.
+    """
+    _ensure_store()
+    with FileLock(PROJECT_INDEX_FILE):
+        with open(PROJECT_INDEX_FILE, "r") as f:
+            events = [json.loads(line) for line in f if line.strip()]
+
+        live: Dict[str, None] = {}
+        for event in events:
+            if event["op"] == "create":
+                live[event["project_id"]] = None
+            else:
+                live.pop(event["project_id"], None)
+
+        if len(live) != len(events):
+            _write_json_atomic(
+                PROJECT_INDEX_FILE,
+                "".join(_index_line("create", pid) for pid in live),
+            )
+
+    projects = []
+    for project_id in live:
+        project = _read_meta(project_id)
+        if project is not None:
+            projects.append(project)
+    return projects
 
 
 def list_projects() -> List[Dict]:
@@ -37,11 +136,12 @@ def list_projects() -> List[Dict]:
 
 
 def get_project(project_id: str) -> Optional[Dict]:
-    projects = _load_projects()
-    return next((p for p in projects if p["project_id"] == project_id), None)
+    _ensure_store()
+    return _read_meta(project_id)
 
 
 def create_project(project_id: str, name: str, template: Optional[str] = None) -> Dict:
+    _ensure_store()
     now = datetime.utcnow().isoformat()
     project = {
         "project_id": project_id,
@@ -51,26 +151,32 @@ def create_project(project_id: str, name: str, template: Optional[str] = None) -
         "updated_at": now,
     }
 
-    projects = _load_projects()
-    projects.append(project)
-    _save_projects(projects)
+    _write_meta(project)
+    _append_index("create", project_id)
     return project
 
 
-def update_project_timestamp(project_id: str) -> None:
-    projects = _load_projects()
-    now = datetime.utcnow().isoformat()
-    for project in projects:
-        if project["project_id"] == project_id:
-            project["updated_at"] = now
-            break
-    _save_projects(projects)
+def update_project_timestamp(project_id: str) -> Optional[Dict]:
+    _ensure_store()
+    if not is_valid_project_id(project_id) or not os.path.exists(_meta_path(project_id)):
+        return None
+    with FileLock(_meta_path(project_id)):
+        project = _read_meta(project_id)
+        if project is None:
+            return None
+        project["updated_at"] = datetime.utcnow().isoformat()
+        _write_meta(project)
+    return project
 
 
 def delete_project(project_id: str) -> bool:
-    projects = _load_projects()
-    remaining = [p for p in projects if p["project_id"] != project_id]
-    if len(remaining) == len(projects):
+    _ensure_store()
+    if not is_valid_project_id(project_id) or not os.path.exists(_meta_path(project_id)):
         return False
-    _save_projects(remaining)
+    with FileLock(_meta_path(project_id)):
+        try:
+            os.remove(_meta_path(project_id))
+        except FileNotFoundError:
+            return False
+    _append_index("delete", project_id)
     return True
@@ -0,0 +1,196 @@
+"""
+Query embedding cache for Global RAG retrieval.
+
+Exact repeats of a query are answered from a hash-keyed LRU with TTL
+(64-bit xxh3 key when xxhash is installed).
+On a miss the query is embedded once and compared against a small ring
+of recent query embeddings; a near-duplicate (cosine >= threshold)
+reuses that query's results instead of searching the index again.
+
+Usage:
+    from query_cache import cached_retrieve
+
+    refs = cached_retrieve(global_rag, user_request, k=3)
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from schemas import GlobalRAGEntry
+
+try:
+    import xxhash
+except ImportError:  # optional: pip install xxhash
+    xxhash = None
+
+
+CACHE_MAXSIZE = 2048
+CACHE_TTL_SECONDS = 3600
+RECENT_QUERIES = 64
+SIMILARITY_THRESHOLD = 0.97
+
+
+def fast_hash(text: str) -> int:
+    """
+    Non-cryptographic 64-bit key for cache lookups.
+
+    Uses xxh3 when xxhash is installed, otherwise an 8-byte BLAKE2b digest.
+    """
+    data = text.encode()
+    if xxhash is not None:
+        return xxhash.xxh3_64_intdigest(data)
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def _unit(embedding: np.ndarray) -> np.ndarray:
+    vec = np.asarray(embedding, dtype="float32").reshape(-1)
+    norm = float(np.linalg.norm(vec))
+    return vec / norm if norm else vec
+
+
+class QueryEmbeddingCache:
+    """
+    Thread-safe cache of Global RAG results keyed by query.
+
+    Entries are dropped whenever the number of Global RAG entries
+    changes, so an ingest never leaves stale results behind.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = CACHE_MAXSIZE,
+        ttl: float = CACHE_TTL_SECONDS,
+        recent: int = RECENT_QUERIES,
+        threshold: float = SIMILARITY_THRESHOLD,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        self.recent = recent
+
+        # (query hash, k) -> (expires_at, results)
+        self._results: "OrderedDict[Tuple[int, int], Tuple[float, List[GlobalRAGEntry]]]" = OrderedDict()
+        # Ring of the most recent misses, stored column-wise so the
+        # near-duplicate check is one matrix-vector product. The embedding
+        # matrix is allocated on first insert, once the dimension is known.
+        self._recent_vecs: Optional[np.ndarray] = None
+        self._recent_k = np.full(recent, -1, dtype=np.int64)
+        self._recent_results: List[Optional[List[GlobalRAGEntry]]] = [None] * recent
+        self._recent_pos = 0
+        self._generation: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def retrieve(
+        self,
+        global_rag,
+        query: str,
+        k: int,
+        query_embedding: Optional[np.ndarray] = None,
+    ) -> List[GlobalRAGEntry]:
+        key = (fast_hash(query), k)
+
+        # Entries ingested by another process change the generation below
+        global_rag.refresh()
+        with self._lock:
+            self._sync_generation(len(global_rag.entries))
+            hit = self._get(key)
+        if hit is not None:
+            return list(hit)
+
+        # Callers that already embedded the query pass it in
+        embedding = query_embedding
+        if embedding is None:
+            embedding = global_rag.embed_query(query)
+        unit = _unit(embedding)
+
+        with self._lock:
+            results = self._nearest(unit, k)
+        if results is None:
+            results = global_rag.search(embedding, k=k)
+
+        with self._lock:
+            self._put(key, unit, k, results)
+        return list(results)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._results.clear()
+            self._clear_recent()
+
+    # ------------------
+    # Internals (caller holds self._lock)
+    # ------------------
+
+    def _sync_generation(self, generation: int) -> None:
+        if generation != self._generation:
+            self._results.clear()
+            self._clear_recent()
+            self._generation = generation
+
+    def _clear_recent(self) -> None:
+        self._recent_k.fill(-1)
+        self._recent_results = [None] * self.recent
+        self._recent_pos = 0
+
+    def _get(self, key) -> Optional[List[GlobalRAGEntry]]:
+        item = self._results.get(key)
+        if item is None:
+            return None
+
+        expires_at, results = item
+        if expires_at < time.monotonic():
+            del self._results[key]
+            return None
+
+        self._results.move_to_end(key)
+        return results
+
+    def _nearest(self, unit: np.ndarray, k: int) -> Optional[List[GlobalRAGEntry]]:
+        if self._recent_vecs is None:
+            return None
+
+        scores = self._recent_vecs @ unit
+        # Empty slots carry k == -1, so this also masks them out.
+        scores[self._recent_k != k] = -np.inf
+        best = int(np.argmax(scores))
+        if scores[best] >= self.threshold:
+            return self._recent_results[best]
+        return None
+
+    def _put(self, key, unit: np.ndarray, k: int, results: List[GlobalRAGEntry]) -> None:
+        self._results[key] = (time.monotonic() + self.ttl, results)
+        self._results.move_to_end(key)
+        while len(self._results) > self.maxsize:
+            self._results.popitem(last=False)
+        if self.recent <= 0:
+            return
+        if self._recent_vecs is None:
+            self._recent_vecs = np.zeros((self.recent, unit.shape[0]), dtype="float32")
+
+        slot = self._recent_pos
+        self._recent_vecs[slot] = unit
+        self._recent_k[slot] = k
+        self._recent_results[slot] = results
+        self._recent_pos = (slot + 1) % self.recent
+
+
+_default_cache = QueryEmbeddingCache()
+
+
+def cached_retrieve(
+    global_rag,
+    query: str,
+    k: int = 3,
+    query_embedding: Optional[np.ndarray] = None,
+) -> List[GlobalRAGEntry]:
+    """
+    Drop-in replacement for global_rag.retrieve(query=..., k=...) that
+    goes through the shared query cache. Pass query_embedding, from
+    global_rag.embed_query(query), to skip embedding the query again.
+    """
+    return _default_cache.retrieve(global_rag, query, k, query_embedding)
@@ -11,6 +11,8 @@ REACT_ENTRY_CANDIDATES = {
     "index.tsx",
     "index.jsx",
 }
+_ENTRY_SUFFIXES = tuple(REACT_ENTRY_CANDIDATES)
+_REACT_SUFFIXES = (".tsx", ".jsx", ".ts", ".js")
 
 
 def validate_runtime(artifacts: List[Artifact]) -> Tuple[bool, List[str]]:
@@ -25,38 +27,38 @@ def validate_runtime(artifacts: List[Artifact]) -> Tuple[bool, List[str]]:
     if not artifacts:
         return False, ["No artifacts available for runtime validation."]
 
-    file_paths = [artifact.file_path.lower() for artifact in artifacts]
-    has_html = any(path.endswith(".html") for path in file_paths)
-    has_react = any(
-        path.endswith((".tsx", ".jsx", ".ts", ".js"))
-        for path in file_paths
-    )
+    # One pass over the artifacts, lower-casing each content at most once
+    has_html = has_react = has_entry = False
+    html_tag = body_tag = entry_ok = False
+    for artifact in artifacts:
+        path = artifact.file_path.lower()
+        if path.endswith(".html"):
+            has_html = True
+            if not (html_tag and body_tag):
+                content = artifact.content.lower()
+                html_tag = html_tag or "<html" in content
+                body_tag = body_tag or "<body" in content
+        elif path.endswith(_REACT_SUFFIXES):
+            has_react = True
+            if path.endswith(_ENTRY_SUFFIXES):
+                has_entry = True
+                if not entry_ok:
+                    content = artifact.content.lower()
+                    entry_ok = "export default" in content or "createroot" in content
 
     if has_html:
-        html_files = [
-            artifact
-            for artifact in artifacts
-            if artifact.file_path.lower().endswith(".html")
-        ]
-        if not any("<html" in artifact.content.lower() for artifact in html_files):
+        if not html_tag:
             errors.append("HTML output missing <html> tag.")
-        if not any("<body" in artifact.content.lower() for artifact in html_files):
+        if not body_tag:
             errors.append("HTML output missing <body> tag.")
 
     if has_react:
-        entry_matches = [
-            artifact
-            for artifact in artifacts
-            if artifact.file_path.lower().endswith(tuple(REACT_ENTRY_CANDIDATES))
-        ]
-        if not entry_matches:
+        if not has_entry:
             errors.append(
                 "React output missing entrypoint (expected App.tsx or main.tsx)."
             )
-        else:
-            entry_content = "\n".join(a.content for a in entry_matches).lower()
-            if "export default" not in entry_content and "createroot" not in entry_content:
-                errors.append("React entrypoint missing export default or createRoot call.")
+        elif not entry_ok:
+            errors.append("React entrypoint missing export default or createRoot call.")
 
     if not has_html and not has_react:
         errors.append("No HTML or React entrypoints found in artifacts.")
@@ -0,0 +1,107 @@
+"""
+Semantic cache for LLM proposals in Orchestrator.handle_request.
+
+A request is answered from the cache when its prompt context (project
+state, lock constraints, allowed files, Global RAG generation) is
+byte-identical to an earlier request's and its user request embeds
+within SIMILARITY_THRESHOLD (cosine) of that request. The cached
+proposals skip Global RAG retrieval, prompt building and the LLM call,
+but still go through validation, lock checks and commit.
+
+Usage:
+    from semantic_cache import context_key, semantic_cache
+
+    key = context_key(stable_prefix, lock_section, *allowed_paths)
+    proposed = semantic_cache.lookup(key, query_embedding)
+    ...
+    semantic_cache.store(key, query_embedding, proposed)
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from validator import ProposedArtifact
+
+
+CACHE_CONTEXTS = 256
+QUERIES_PER_CONTEXT = 16
+SIMILARITY_THRESHOLD = 0.95
+
+
+def context_key(*parts: str) -> bytes:
+    """
+    Digest of everything besides the user request that shapes the prompt.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part.encode())
+        h.update(b"\0")
+    return h.digest()
+
+
+def _unit(embedding: np.ndarray) -> np.ndarray:
+    vec = np.asarray(embedding, dtype="float32").reshape(-1)
+    norm = float(np.linalg.norm(vec))
+    return vec / norm if norm else vec
+
+
+def _copy(proposals: List[ProposedArtifact]) -> List[ProposedArtifact]:
+    return [replace(p) for p in proposals]
+
+
+class SemanticCache:
+    """
+    Thread-safe map of prompt context -> recent (query embedding, proposals).
+
+    Any change to the project state changes the context key, so entries
+    for an outdated state are never matched and age out of the LRU.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = CACHE_CONTEXTS,
+        per_context: int = QUERIES_PER_CONTEXT,
+        threshold: float = SIMILARITY_THRESHOLD,
+    ):
+        self.maxsize = maxsize
+        self.per_context = per_context
+        self.threshold = threshold
+
+        self._contexts: "OrderedDict[bytes, List[Tuple[np.ndarray, List[ProposedArtifact]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, key: bytes, embedding: np.ndarray) -> Optional[List[ProposedArtifact]]:
+        unit = _unit(embedding)
+        with self._lock:
+            entries = self._contexts.get(key)
+            if not entries:
+                return None
+            self._contexts.move_to_end(key)
+
+            scores = np.stack([vec for vec, _ in entries]) @ unit
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+            return _copy(entries[best][1])
+
+    def store(self, key: bytes, embedding: np.ndarray, proposals: List[ProposedArtifact]) -> None:
+        entry = (_unit(embedding), _copy(proposals))
+        with self._lock:
+            entries = self._contexts.setdefault(key, [])
+            entries.append(entry)
+            del entries[:-self.per_context]
+            self._contexts.move_to_end(key)
+            while len(self._contexts) > self.maxsize:
+                self._contexts.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._contexts.clear()
+
+
+semantic_cache = SemanticCache()
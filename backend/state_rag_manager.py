@@ -1,14 +1,98 @@
+import functools
+import hashlib
+import heapq
+import itertools
 import json
 import os
-from typing import List, Optional
+import threading
+from collections import OrderedDict, deque
+from operator import attrgetter
+from typing import Dict, List, Optional, Set, Tuple
 from datetime import datetime
 
+import numpy as np
+from pydantic import TypeAdapter, ValidationError
+
 from artifact import Artifact
 from state_rag_enums import ArtifactSource, ArtifactType
 from project_store import PROJECTS_DIR
 from file_lock import FileLock, SharedFileLock
+from query_cache import fast_hash
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Below this many active artifacts exact flat search beats HNSW.
+ANN_MIN_ARTIFACTS = 500
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 80
+# Cosine cutoff for semantic matches. Same cut as the old squared-L2
+# threshold of 1.2 on unit vectors (d^2 = 2 - 2*cos).
+MIN_SIMILARITY = 0.4
+EMBED_BATCH_SIZE = 64
+# Inactive versions kept per file; older ones are evicted as they fall
+# out, and the artifact list is compacted once this many are pending.
+KEEP_INACTIVE_VERSIONS = 5
+CLEANUP_BATCH = 50
+# Commits are appended to artifacts.jsonl; the log is folded back into
+# the artifacts.json snapshot on cleanup or once it grows past this.
+LOG_COMPACT_BYTES = 4 * 1024 * 1024
+# Unit query embeddings, shared by every manager in the process
+QUERY_CACHE_SIZE = 1024
+# Ranked artifact ids kept per manager, by query and revision
+RANKED_CACHE_SIZE = 256
+
+# Process-wide so a revision number is never reused, even by a fresh
+# manager for the same project.
+_revision_counter = itertools.count(1)
+
+_ARTIFACT_LIST = TypeAdapter(List[Artifact])
+
+# _disk_state value that never matches: reload on the next refresh()
+_STALE = ()
+
+# fast_hash(query) -> unit embedding. The model is shared and fixed for
+# the process, so entries never go stale; only the LRU bounds them.
+_query_embeddings: "OrderedDict[int, np.ndarray]" = OrderedDict()
+_query_embeddings_lock = threading.Lock()
+
+_STRUCTURAL_CONTEXT = {
+    ArtifactType.layout: "This file defines the root application layout and may handle routing and page rendering.",
+    ArtifactType.page: "This file represents a standalone application page.",
+    ArtifactType.component: "This file defines a reusable UI component.",
+    ArtifactType.config: "This file defines application configuration or build setup.",
+}
+
+
+def _same_payload(old: Artifact, new: Artifact) -> bool:
+    return (
+        old.content == new.content
+        and old.source == new.source
+        and old.type == new.type
+        and old.language == new.language
+        and old.name == new.name
+        and old.dependencies == new.dependencies
+    )
+
+
+def _locked(method):
+    # Managers are shared between request threads (api_v2 caches one per
+    # project); public entry points take the manager's lock.
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _embedding_text(a: Artifact) -> str:
+    structural_context = _STRUCTURAL_CONTEXT.get(a.type, "")
+    return f"""
+            Artifact Type: {a.type}
+            File Path: {a.file_path}
+            Structural Role: {structural_context}
+
+            Content:
+            {a.content[:1000]}
+            """
 
 
 class StateRAGManager:
@@ -29,127 +113,400 @@ class StateRAGManager:
             "artifacts.json"
         )
 
+        # Artifact embeddings keyed by a digest of the embedded text, so a
+        # rebuild only encodes new or changed artifacts. Saved next to the
+        # state file on compaction or flush_index() to survive restarts.
+        self.embeddings_path = os.path.join(
+            os.path.dirname(self.state_path), "embeddings.npz"
+        )
+        self._emb_cache: Dict[str, np.ndarray] = {}
+        # The FAISS index and the artifact id of each row, saved with the
+        # embeddings so a restarted process skips rebuilding it. Commits
+        # since the last save are added back when it is loaded.
+        self.faiss_path = os.path.join(
+            os.path.dirname(self.state_path), "faiss.index"
+        )
+        self.faiss_ids_path = self.faiss_path + ".ids.json"
+        # artifact_id -> key of its text in _emb_cache
+        self._text_keys: Dict[str, str] = {}
+        # (digest, mtime_ns) of the last state file this instance wrote
+        self._persisted: Optional[Tuple[bytes, int]] = None
+
+        # Append-only commit log replayed on top of the snapshot
+        self.log_path = os.path.join(
+            os.path.dirname(self.state_path), "artifacts.jsonl"
+        )
+        self._unlogged: List[bytes] = []
+
         self.artifacts = []
+        # The one active version of each file path, in commit order
+        self._active_by_path: Dict[str, Artifact] = {}
+        # The same artifacts by id, for dependency lookups
+        self._active_by_id: Dict[str, Artifact] = {}
+        # Per file path, a min-heap of (version, artifact_id) of inactive
+        # versions still kept; evicted ids wait in _pending_removal.
+        self._inactive_by_path: Dict[str, List[Tuple[int, str]]] = {}
+        self._pending_removal: Set[str] = set()
         self._embedder = None
         self._faiss_index = None
         self._faiss_ids = []
+        self._faiss_mapped = False
+        # (fast_hash(query), revision, limit) -> ranked artifact ids
+        self._ranked_ids: "OrderedDict[tuple, List[str]]" = OrderedDict()
+        # Changed in memory since the last save
+        self._emb_dirty = False
+        self._faiss_dirty = False
+
+        self._lock = threading.RLock()
+        # (mtime_ns, size) of the snapshot and the log as of this
+        # manager's last read or write, to notice other writers
+        self._disk_state: tuple = _STALE
 
         self._load()
 
+        # Changes whenever committed state changes; lets callers cache
+        # results derived from this project's artifacts.
+        self.revision = next(_revision_counter)
+
     # ======================
     # Persistence
     # ======================
 
     def _load(self):
-        if not os.path.exists(self.state_path):
+        if not os.path.exists(self.state_path) and not os.path.exists(self.log_path):
+            self._disk_state = self._disk_signature()
             return
 
-        try:
-            # Ensure consistent reads across processes.
-            with SharedFileLock(self.state_path):
-                with open(self.state_path, "r") as f:
-                    content = f.read().strip()
-                    if not content:
-                        return
-
-                    raw = json.loads(content)
-                    self.artifacts = [Artifact(**a) for a in raw]
+        # Ensure consistent reads across processes.
+        with SharedFileLock(self.state_path):
+            self._disk_state = self._disk_signature()
+            self._load_snapshot()
+            needs_compact = self._replay_log()
 
-        except json.JSONDecodeError:
-            print("⚠️ Warning: corrupted state file. Starting fresh.")
-            self.artifacts = []
+        self._index_versions()
+        if needs_compact:
+            self.compact()
         
         # FIX #1: Force FAISS rebuild after loading artifacts
         # Without this, semantic search uses stale embeddings
         if self.artifacts:
             self._embedder = None  # Reset to trigger lazy init on next semantic search
 
+    def _disk_signature(self) -> tuple:
+        signature = []
+        for path in (self.state_path, self.log_path):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                signature.append(None)
+            else:
+                signature.append((st.st_mtime_ns, st.st_size))
+        return tuple(signature)
+
+    def refresh(self) -> bool:
+        """
+        Reload if the snapshot or log changed on disk since this manager
+        last read or wrote them: another process, or another manager for
+        the same project. Returns True if it reloaded.
+        """
+        with self._lock:
+            if self._disk_signature() == self._disk_state:
+                return False
+
+            self.artifacts = []
+            self._unlogged = []
+            self._index_versions()
+            # Re-initialized from disk on the next semantic search
+            self._embedder = None
+            self._faiss_index = None
+            self._faiss_ids = []
+            self._faiss_mapped = False
+            self._faiss_dirty = False
+            self._load()
+            self.revision = next(_revision_counter)
+            return True
+
+    def _load_snapshot(self):
+        if not os.path.exists(self.state_path):
+            return
+
+        try:
+            # Parsed straight from the raw bytes: no decoded str copy of
+            # the whole file alongside the artifacts being built from it.
+            with open(self.state_path, "rb") as f:
+                content = f.read()
+            if not content or content.isspace():
+                return
+
+            self.artifacts = _ARTIFACT_LIST.validate_json(content)
+
+        except ValidationError as exc:
+            # Only unparseable JSON; invalid artifacts still raise
+            if exc.errors()[0]["type"] != "json_invalid":
+                raise
+            print("⚠️ Warning: corrupted state file. Starting fresh.")
+            self.artifacts = []
+
+    def _replay_log(self) -> bool:
+        """
+        Apply the commit log on top of the snapshot. Returns True when the
+        log should be compacted (large, or ends in a torn write).
+        """
+        if not os.path.exists(self.log_path):
+            return False
+
+        by_id = {a.artifact_id: a for a in self.artifacts}
+        torn = False
+        with open(self.log_path, "rb") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    torn = True
+                    continue
+
+                if event["op"] == "commit":
+                    # Already in the snapshot if a compaction was cut short
+                    if event["artifact"]["artifact_id"] not in by_id:
+                        artifact = Artifact.model_validate(event["artifact"])
+                        by_id[artifact.artifact_id] = artifact
+                        self.artifacts.append(artifact)
+                elif event["op"] == "deactivate":
+                    old = by_id.get(event["artifact_id"])
+                    if old is not None:
+                        old.is_active = False
+                        old.updated_at = datetime.fromisoformat(event["updated_at"])
+
+        if torn:
+            print("⚠️ Warning: skipped unreadable lines in the commit log.")
+        return torn or os.path.getsize(self.log_path) > LOG_COMPACT_BYTES
+
+    def _append_log(self):
+        """
+        Append the pending commit events: write cost scales with the
+        commit instead of with every artifact in the project.
+        """
+        if not self._unlogged:
+            return
+        os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+        with FileLock(self.state_path):
+            self._write_log()
+
+    def _write_log(self):
+        # Caller holds FileLock(self.state_path)
+        foreign = self._disk_signature() != self._disk_state
+        with open(self.log_path, "ab") as f:
+            f.writelines(self._unlogged)
+            f.flush()
+            os.fsync(f.fileno())
+        self._unlogged = []
+        # Someone else wrote since our last read: both sets of events are
+        # in the log now, and the next refresh() reads them back.
+        self._disk_state = _STALE if foreign else self._disk_signature()
+
+    @_locked
+    def compact(self):
+        """
+        Fold the commit log into a fresh artifacts.json snapshot, and save
+        the semantic index with it.
+        """
+        self._persist()
+        self.flush_index()
+
+    @_locked
+    def flush_index(self):
+        """
+        Write the embeddings and FAISS index if commits changed them since
+        the last write. Between writes they are only a cache: a new manager
+        loads the saved index and adds whatever was committed after it.
+        """
+        if self._emb_dirty:
+            self._save_embeddings()
+            self._emb_dirty = False
+        if self._faiss_dirty:
+            if self._faiss_index is not None:
+                self._save_faiss_index()
+            self._faiss_dirty = False
+
     def _persist(self):
+        # Serialized in pydantic-core (Rust) rather than json.dump + .dict();
+        # compact like the commit log, it is machine state
+        data = _ARTIFACT_LIST.dump_json(self.artifacts)
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+
         os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
         with FileLock(self.state_path):
-            with open(self.state_path, "w") as f:
-                json.dump(
-                    [a.dict() for a in self.artifacts],
-                    f,
-                    indent=2,
-                    default=str,
-                )
+            if self._disk_signature() != self._disk_state:
+                # Another writer committed since our last read. Rewriting
+                # the snapshot from memory would drop its commits, so only
+                # log ours; compaction waits for a manager that is current.
+                self._write_log()
+                return
+
+            # Skip the write when nothing changed since our last one and
+            # no other process has replaced the file in the meantime.
+            if self._persisted is not None and self._persisted[0] == digest:
+                try:
+                    if os.stat(self.state_path).st_mtime_ns == self._persisted[1]:
+                        return
+                except OSError:
+                    pass
+
+            tmp_path = self.state_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self.state_path)
+            self._persisted = (digest, os.stat(self.state_path).st_mtime_ns)
+
+            # Everything in the log is now in the snapshot
+            if os.path.exists(self.log_path):
+                os.truncate(self.log_path, 0)
+            self._disk_state = self._disk_signature()
+        self._unlogged = []
 
     # ======================
     # Cleanup (Memory Leak Fix)
     # ======================
 
-    def cleanup_old_versions(self, keep_versions: int = 5):
+    @_locked
+    def cleanup_old_versions(self, keep_versions: int = KEEP_INACTIVE_VERSIONS):
         """
         FIX #2: Remove old inactive versions to prevent unbounded growth.
         Keeps all active versions + N most recent inactive versions per file.
         """
-        by_path = {}
+        self.refresh()
+        # One pass: the per-path heaps hold at most N inactive versions,
+        # everything pushed out of them is pending removal.
+        self._index_versions(keep_versions)
+        if self._pending_removal:
+            self._drop_evicted_versions()
+            self.compact()
+
+    def _index_versions(self, keep_versions: int = KEEP_INACTIVE_VERSIONS):
+        """
+        Rebuild the active-by-path index and the per-path heaps of
+        inactive versions from self.artifacts.
+        """
+        self._active_by_path = {}
+        self._inactive_by_path = {}
+        self._pending_removal = set()
         for a in self.artifacts:
-            if a.file_path not in by_path:
-                by_path[a.file_path] = []
-            by_path[a.file_path].append(a)
-        
-        to_keep = []
-        for path, versions in by_path.items():
-            # Sort by version descending (newest first)
-            sorted_versions = sorted(versions, key=lambda x: x.version, reverse=True)
-            
-            # Keep all active versions + N most recent inactive
-            active = [v for v in sorted_versions if v.is_active]
-            inactive = [v for v in sorted_versions if not v.is_active]
-            
-            to_keep.extend(active)
-            to_keep.extend(inactive[:keep_versions])
-        
-        old_count = len(self.artifacts)
-        self.artifacts = to_keep
-        removed = old_count - len(self.artifacts)
-        
-        if removed > 0:
-            print(f"🧹 Cleaned up {removed} old artifact versions")
-            self._persist()
+            if a.is_active:
+                self._active_by_path[a.file_path] = a
+            else:
+                self._track_inactive(a, keep_versions)
+        self._active_by_id = {a.artifact_id: a for a in self._active_by_path.values()}
+
+    def _track_inactive(self, artifact: Artifact, keep_versions: int = KEEP_INACTIVE_VERSIONS):
+        # O(log k): push the newly inactive version, evict the oldest
+        heap = self._inactive_by_path.setdefault(artifact.file_path, [])
+        heapq.heappush(heap, (artifact.version, artifact.artifact_id))
+        if len(heap) > keep_versions:
+            _, evicted_id = heapq.heappop(heap)
+            self._pending_removal.add(evicted_id)
+
+    def _drop_evicted_versions(self):
+        self.artifacts = [
+            a for a in self.artifacts if a.artifact_id not in self._pending_removal
+        ]
+        print(f"🧹 Cleaned up {len(self._pending_removal)} old artifact versions")
+        self._pending_removal = set()
 
     # ======================
     # Commit logic
     # ======================
 
     def commit(self, new_artifact: Artifact) -> Artifact:
-        active_versions = [
-            a for a in self.artifacts
-            if a.file_path == new_artifact.file_path and a.is_active
-        ]
+        return self.commit_many([new_artifact])[0]
+
+    @_locked
+    def commit_many(self, new_artifacts: List[Artifact]) -> List[Artifact]:
+        """
+        Commit several artifacts with a single persist.
 
+        Versioning is applied per artifact exactly as in commit(), but the
+        commit log is locked and appended to once for the batch.
+
+        Returns the active artifact for each input: the input itself, or
+        the unchanged current version when the commit was a no-op.
+        """
+        self.refresh()
+
+        # One clock read for the batch: every version it supersedes or
+        # creates carries the same timestamp.
+        now = datetime.utcnow()
+        committed = [self._apply_commit(a, now) for a in new_artifacts]
+
+        # Nothing to write, and nothing to re-embed
+        if not self._unlogged:
+            return committed
+
+        # FIX #2: Old versions are evicted per file as they go inactive;
+        # the list is compacted in batches, along with the commit log.
+        compacted = len(self._pending_removal) >= CLEANUP_BATCH
+        if compacted:
+            self._drop_evicted_versions()
+            self._persist()
+        else:
+            self._append_log()
+
+        self.revision = next(_revision_counter)
+
+        # Update FAISS index only if already initialized
+        if self._embedder is not None:
+            self._update_faiss_index([
+                a for a, c in zip(new_artifacts, committed)
+                if a is c and a.is_active
+            ])
+        if compacted:
+            # Saved after the update so the index matches the snapshot
+            self.flush_index()
+
+        return committed
+
+    def _apply_commit(self, new_artifact: Artifact, now: datetime) -> Artifact:
+        old = self._active_by_path.get(new_artifact.file_path)
+
+        # Re-saving the current version as-is is a no-op: no new version,
+        # no log write and no index rebuild.
+        if old is not None and _same_payload(old, new_artifact):
+            return old
 
         # Versioning
         new_version = 1
-        if active_versions:
-            new_version = max(a.version for a in active_versions) + 1
-            for old in active_versions:
-                old.is_active = False
-                old.updated_at = datetime.utcnow()
+        if old is not None:
+            new_version = old.version + 1
+            old.is_active = False
+            old.updated_at = now
+            self._active_by_id.pop(old.artifact_id, None)
+            self._track_inactive(old)
+            self._unlogged.append(
+                json.dumps({
+                    "op": "deactivate",
+                    "artifact_id": old.artifact_id,
+                    "updated_at": old.updated_at.isoformat(),
+                }).encode() + b"\n"
+            )
 
         new_artifact.version = new_version
         new_artifact.is_active = True
-        new_artifact.updated_at = datetime.utcnow()
+        new_artifact.updated_at = now
 
         self.artifacts.append(new_artifact)
-        self._persist()
-
-        # FIX #2: Cleanup old versions periodically (every 10 commits)
-        if len(self.artifacts) % 10 == 0:
-            self.cleanup_old_versions(keep_versions=5)
-
-        # Rebuild FAISS index only if already initialized
-        if self._embedder is not None:
-            self._build_faiss_index()
-
+        # Re-inserted so the index keeps commit order, like self.artifacts
+        self._active_by_path.pop(new_artifact.file_path, None)
+        self._active_by_path[new_artifact.file_path] = new_artifact
+        self._active_by_id[new_artifact.artifact_id] = new_artifact
+        self._unlogged.append(
+            b'{"op":"commit","artifact":' + new_artifact.model_dump_json().encode() + b"}\n"
+        )
         return new_artifact
 
     # ======================
     # Retrieval
     # ======================
 
+    @_locked
     def retrieve(
         self,
         scope: Optional[List[ArtifactType]] = None,
@@ -157,24 +514,30 @@ class StateRAGManager:
         limit: int = 10,
         user_query: Optional[str] = None,
     ) -> List[Artifact]:
+        self.refresh()
 
-        # 1. Active only
-        artifacts = [a for a in self.artifacts if a.is_active]
+        # 1. Active only, 3. file path filter: straight from the index
+        if file_paths:
+            artifacts = [
+                self._active_by_path[p]
+                for p in dict.fromkeys(file_paths)
+                if p in self._active_by_path
+            ]
+        else:
+            artifacts = list(self._active_by_path.values())
 
         # 2. Scope filter
         if scope:
             artifacts = [a for a in artifacts if a.type in scope]
 
-        # 3. File path filter
-        if file_paths:
-            artifacts = [a for a in artifacts if a.file_path in file_paths]
-
         # 4. Dependency expansion
         artifacts = self._expand_dependencies(artifacts)
 
-        # 5. Semantic ranking (optional)
-        if user_query:
-            ranked = self._rank_with_faiss(artifacts, user_query)
+        # 5. Semantic ranking (optional). When every candidate fits within
+        # limit there is nothing to choose between: return them all, in
+        # the deterministic order below, without loading the model.
+        if user_query and len(artifacts) > limit:
+            ranked = self._rank_with_faiss(artifacts, user_query, limit)
         
             # If semantic retrieval returned nothing,
             # fall back to structural baseline (layout files)
@@ -187,9 +550,10 @@ class StateRAGManager:
             artifacts = ranked
 
 
-        # 6. Deterministic fallback order
+        # 6. Deterministic fallback order: only the first `limit` paths
+        # are needed, so select them (O(n log limit)) instead of sorting
         else:
-            artifacts.sort(key=lambda a: a.file_path)
+            artifacts = heapq.nsmallest(limit, artifacts, key=attrgetter("file_path"))
 
         return artifacts[:limit]
 
@@ -207,29 +571,23 @@ class StateRAGManager:
         
         Now tracks visited nodes to break cycles.
         """
-        result = {a.artifact_id: a for a in artifacts}
-        lookup = {
-            a.artifact_id: a
-            for a in self.artifacts
-            if a.is_active
-        }
+        lookup = self._active_by_id
 
-        visited = set()  # NEW: Track all visited nodes to prevent cycles
-        queue = list(artifacts)
+        # result doubles as the visited set: dedupe and cycle guard
+        result: Dict[str, Artifact] = {}
+        queue = deque(artifacts)
 
         while queue:
-            current = queue.pop(0)
+            current = queue.popleft()
             
-            # NEW: Skip if already processed (prevents cycles)
-            if current.artifact_id in visited:
+            # Skip if already processed (prevents cycles)
+            if current.artifact_id in result:
                 continue
-            visited.add(current.artifact_id)
+            result[current.artifact_id] = current
             
             for dep_id in current.dependencies:
                 if dep_id in lookup and dep_id not in result:
-                    dep = lookup[dep_id]
-                    result[dep_id] = dep
-                    queue.append(dep)
+                    queue.append(lookup[dep_id])
 
         return list(result.values())
 
@@ -241,81 +599,270 @@ class StateRAGManager:
         if self._embedder is None:
             print("⏳ Initializing semantic index (one-time)...")
 
-            from sentence_transformers import SentenceTransformer
+            from embedding_model import load_embedding_model
             import faiss
 
-            self._embedder = SentenceTransformer("all-MiniLM-L6-v2")
-            self._build_faiss_index()
+            self._embedder = load_embedding_model()
+            self._load_embeddings()
+            if not self._load_faiss_index():
+                self._build_faiss_index()
 
             print("✅ Semantic index ready")
 
     def _build_faiss_index(self):
-        active = [a for a in self.artifacts if a.is_active]
+        active = list(self._active_by_path.values())
         if not active:
             self._faiss_index = None
             self._faiss_ids = []
             return
 
-        texts = []
+        import faiss
 
-        for a in active:
-            structural_context = ""
+        keys, encoded = self._embedding_keys(active)
+        self._text_keys = {a.artifact_id: key for a, key in zip(active, keys)}
 
-            if a.type == "layout":
-                structural_context = "This file defines the root application layout and may handle routing and page rendering."
+        # Inactive versions are never ranked; drop their vectors
+        stale = len(self._emb_cache) > len(set(keys))
+        if stale:
+            self._emb_cache = {key: self._emb_cache[key] for key in keys}
+        if encoded or stale:
+            self._emb_dirty = True
 
-            elif a.type == "page":
-                structural_context = "This file represents a standalone application page."
+        embeddings = np.ascontiguousarray(
+            np.stack([self._emb_cache[key] for key in keys]), dtype="float32"
+        )
+        dim = embeddings.shape[1]
+        if len(active) >= ANN_MIN_ARTIFACTS:
+            # 8-bit codes; enough vectors at this size to fit the ranges
+            index = faiss.IndexHNSWSQ(
+                dim, faiss.ScalarQuantizer.QT_8bit, HNSW_M, faiss.METRIC_INNER_PRODUCT
+            )
+            index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+            index.train(embeddings)
+        else:
+            # fp16 codes need no training, unlike 8-bit on a handful of files
+            index = faiss.IndexScalarQuantizer(
+                dim, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT
+            )
+        index.add(embeddings)
 
-            elif a.type == "component":
-                structural_context = "This file defines a reusable UI component."
+        self._faiss_index = index
+        self._faiss_ids = [a.artifact_id for a in active]
+        self._faiss_mapped = False
+        self._faiss_dirty = True
 
-            elif a.type == "config":
-                structural_context = "This file defines application configuration or build setup."
+    def _update_faiss_index(self, added: List[Artifact]):
+        """
+        Add newly committed artifacts to the live index instead of
+        rebuilding it. Superseded versions stay behind as dead rows, which
+        _rank_with_faiss never returns since they are not candidates, until
+        they outnumber the live ones or the index type has to change.
+        """
+        import faiss
 
-            text = f"""
-            Artifact Type: {a.type}
-            File Path: {a.file_path}
-            Structural Role: {structural_context}
+        active_count = len(self._active_by_path)
+        dead = len(self._faiss_ids) + len(added) - active_count
+        if (
+            self._faiss_index is None
+            or dead > active_count
+            or (active_count >= ANN_MIN_ARTIFACTS) != isinstance(self._faiss_index, faiss.IndexHNSW)
+        ):
+            self._build_faiss_index()
+            return
 
-            Content:
-            {a.content[:1000]}
-            """
+        if not added:
+            return
+        keys, encoded = self._embedding_keys(added)
+        if encoded:
+            self._emb_dirty = True
+        if self._faiss_mapped:
+            # Mapped storage is read-only; take an owned copy before adding.
+            self._faiss_index = faiss.deserialize_index(
+                faiss.serialize_index(self._faiss_index)
+            )
+            self._faiss_mapped = False
+        self._faiss_index.add(np.ascontiguousarray(
+            np.stack([self._emb_cache[key] for key in keys]), dtype="float32"
+        ))
+        self._faiss_ids.extend(a.artifact_id for a in added)
+        self._faiss_dirty = True
+
+    def _embedding_keys(self, artifacts: List[Artifact]) -> Tuple[List[str], bool]:
+        """
+        _emb_cache keys for the artifacts, encoding whatever is missing.
+        Also returns whether anything had to be encoded.
+        """
+        import faiss
 
-            texts.append(text)
+        # Text is only built (and hashed) for artifacts not seen before;
+        # a committed artifact's type, path and content never change.
+        keys = []
+        pending: Dict[str, str] = {}
+        for a in artifacts:
+            key = self._text_keys.get(a.artifact_id)
+            if key is None or key not in self._emb_cache:
+                text = _embedding_text(a)
+                key = hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+                self._text_keys[a.artifact_id] = key
+                if key not in self._emb_cache:
+                    pending[key] = text
+            keys.append(key)
+
+        if pending:
+            fresh = self._embedder.encode(
+                list(pending.values()),
+                batch_size=EMBED_BATCH_SIZE,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            ).astype("float32")
+            # Unit vectors, so inner product is cosine similarity
+            faiss.normalize_L2(fresh)
+            # Held as fp16: half the memory, and ample precision for a
+            # cosine cutoff
+            for key, vec in zip(pending, fresh.astype(np.float16)):
+                self._emb_cache[key] = vec
+
+        return keys, bool(pending)
+
+    def _load_faiss_index(self) -> bool:
+        """
+        Reuse the saved index. It is written only on compaction or flush,
+        so artifacts committed after that are added now, the same way a
+        commit adds them; rows of versions committed over since are dead
+        rows, and _update_faiss_index rebuilds when its limits are hit.
+        """
+        if not self._active_by_id or not os.path.exists(self.faiss_path):
+            return False
 
+        import faiss
 
-        embeddings = self._embedder.encode(texts).astype("float32")
+        try:
+            with SharedFileLock(self.faiss_path):
+                # Memory-mapped: nothing is copied until a commit adds rows
+                index = faiss.read_index(
+                    self.faiss_path,
+                    getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP),
+                )
+                with open(self.faiss_ids_path, "r") as f:
+                    ids = json.load(f)
+        except (OSError, RuntimeError, ValueError):
+            # Only a cache: rebuild from the embeddings
+            return False
 
-        import faiss
-        dim = embeddings.shape[1]
-        index = faiss.IndexFlatL2(dim)
-        index.add(embeddings)
+        if index.ntotal != len(ids):
+            return False
 
         self._faiss_index = index
-        self._faiss_ids = [a.artifact_id for a in active]
+        self._faiss_ids = ids
+        self._faiss_mapped = True
 
-    def _rank_with_faiss(self, artifacts: List[Artifact], query: str) -> List[Artifact]:
-        self._ensure_faiss_ready()
+        rows = set(ids)
+        self._update_faiss_index(
+            [a for a in self._active_by_path.values() if a.artifact_id not in rows]
+        )
+        return True
 
-        if not self._faiss_index:
-            return artifacts
+    def _save_faiss_index(self):
+        import faiss
 
-        query_emb = self._embedder.encode([query]).astype("float32")
-        distances, indices = self._faiss_index.search(query_emb, len(self._faiss_ids))
+        os.makedirs(os.path.dirname(self.faiss_path), exist_ok=True)
+        with FileLock(self.faiss_path):
+            # Written aside and renamed into place: other managers may have
+            # the old file memory-mapped.
+            tmp_path = self.faiss_path + ".tmp"
+            faiss.write_index(self._faiss_index, tmp_path)
+            os.replace(tmp_path, self.faiss_path)
+
+            tmp_path = self.faiss_ids_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._faiss_ids, f)
+            os.replace(tmp_path, self.faiss_ids_path)
+
+    def _load_embeddings(self):
+        if not os.path.exists(self.embeddings_path):
+            return
+        try:
+            with np.load(self.embeddings_path) as data:
+                vectors = data["vectors"].astype(np.float16)
+                loaded = dict(zip(data["keys"].tolist(), vectors))
+        except (OSError, ValueError, KeyError):
+            # Only a cache: rebuild from scratch
+            return
+        # Keep vectors encoded since the last save (after a refresh)
+        loaded.update(self._emb_cache)
+        self._emb_cache = loaded
+
+    def _save_embeddings(self):
+        os.makedirs(os.path.dirname(self.embeddings_path), exist_ok=True)
+        tmp_path = self.embeddings_path + ".tmp.npz"
+        keys = list(self._emb_cache)
+        vectors = (
+            np.stack([self._emb_cache[k] for k in keys])
+            if keys
+            else np.zeros((0, 0), dtype=np.float16)
+        )
+        np.savez(tmp_path, keys=np.array(keys), vectors=vectors)
+        os.replace(tmp_path, self.embeddings_path)
+
+    def _rank_with_faiss(
+        self,
+        artifacts: List[Artifact],
+        query: str,
+        limit: Optional[int] = None,
+    ) -> List[Artifact]:
+        # When every active artifact is a candidate only the top `limit`
+        # live hits can survive; otherwise the hits don't depend on limit.
+        everything = bool(limit) and len(artifacts) >= len(self._active_by_path)
+
+        # Hits only change when committed state does, and every change
+        # bumps self.revision: repeated queries skip the search.
+        key = (fast_hash(query), self.revision, limit if everything else None)
+        hit_ids = self._ranked_ids.get(key)
+        if hit_ids is not None:
+            self._ranked_ids.move_to_end(key)
+        else:
+            self._ensure_faiss_ready()
+
+            if not self._faiss_index:
+                return artifacts
+
+            # Leave room for dead rows of superseded versions; scan all
+            # rows when filtered candidates could otherwise be missed.
+            search_k = len(self._faiss_ids)
+            if everything:
+                search_k = min(limit + search_k - len(self._active_by_path), search_k)
 
-        threshold = 1.2  # tune this
+            query_emb = self._embed_query(query)
+            similarities, indices = self._faiss_index.search(query_emb, search_k)
+            hit_ids = [
+                self._faiss_ids[idx]
+                for sim, idx in zip(similarities[0], indices[0])
+                if idx != -1 and sim > MIN_SIMILARITY
+            ]
+
+            self._ranked_ids[key] = hit_ids
+            while len(self._ranked_ids) > RANKED_CACHE_SIZE:
+                self._ranked_ids.popitem(last=False)
 
         artifact_by_id = {a.artifact_id: a for a in artifacts}
+        return [artifact_by_id[i] for i in hit_ids if i in artifact_by_id]
+
+    def _embed_query(self, query: str) -> np.ndarray:
+        # Repeated queries skip the encoder: a dict hit instead of a
+        # forward pass through the model.
+        key = fast_hash(query)
+        with _query_embeddings_lock:
+            cached = _query_embeddings.get(key)
+            if cached is not None:
+                _query_embeddings.move_to_end(key)
+                return cached
 
-        ranked = []
-        for dist, idx in zip(distances[0], indices[0]):
-            if idx == -1:
-                continue
-            if dist < threshold:
-                artifact_id = self._faiss_ids[idx]
-                match = artifact_by_id.get(artifact_id)
-                if match:
-                    ranked.append(match)
+        import faiss
+        query_emb = self._embedder.encode([query]).astype("float32")
+        faiss.normalize_L2(query_emb)
 
-        return ranked
+        with _query_embeddings_lock:
+            _query_embeddings[key] = query_emb
+            while len(_query_embeddings) > QUERY_CACHE_SIZE:
+                _query_embeddings.popitem(last=False)
+        return query_emb
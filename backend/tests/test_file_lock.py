@@ -0,0 +1,56 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import file_lock
+from file_lock import FileLock, SharedFileLock, release_lock_files
+
+
+class LockFileCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.addCleanup(release_lock_files, self.root)
+
+    def _path(self, *parts):
+        path = os.path.join(self.root, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def test_cache_is_bounded_and_keeps_held_locks_open(self):
+        with mock.patch.object(file_lock, "_LOCK_FDS_MAX", 4):
+            with FileLock(self._path("held.json")) as held:
+                for i in range(10):
+                    with SharedFileLock(self._path(f"f{i}.json")):
+                        pass
+                cached = [p for p in file_lock._LOCK_FDS if p.startswith(self.root)]
+                self.assertLessEqual(len(cached), 4)
+                self.assertIn(held.filepath, file_lock._LOCK_FDS)
+                self.assertFalse(held.lock_file.closed)
+
+    def test_release_matches_whole_directory_names(self):
+        with FileLock(self._path("p1", "a.json")):
+            pass
+        with FileLock(self._path("p10", "a.json")):
+            pass
+
+        release_lock_files(os.path.join(self.root, "p1"))
+
+        cached = [p for p in file_lock._LOCK_FDS if p.startswith(self.root)]
+        self.assertEqual(cached, [os.path.join(self.root, "p10", "a.json.lock")])
+
+    def test_release_skips_held_locks(self):
+        with FileLock(self._path("p1", "a.json")) as held:
+            release_lock_files(os.path.join(self.root, "p1"))
+            self.assertFalse(held.lock_file.closed)
+        release_lock_files(os.path.join(self.root, "p1"))
+        self.assertNotIn(held.filepath, file_lock._LOCK_FDS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import os
+import sys
+import types
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm_adapter
+from llm_adapter import GEMINI_CACHE_MIN_CHARS, LLMAdapter
+
+
+class _FakeChunk:
+    def __init__(self, text):
+        self.text = text
+        self.parts = [text] if text else []
+
+
+class _FakeModel:
+    def __init__(self, name, cached_content=None):
+        self.name = name
+        self.cached_content = cached_content
+        self.calls = []
+
+    @classmethod
+    def from_cached_content(cls, cached_content):
+        return cls("cached", cached_content=cached_content)
+
+    def generate_content(self, contents, generation_config=None, stream=False):
+        self.calls.append((contents, stream))
+        text = "FILE: src/App.tsx\nexport default 1;\n"
+        if stream:
+            return iter([_FakeChunk(text[:10]), _FakeChunk(""), _FakeChunk(text[10:])])
+        return types.SimpleNamespace(text=text)
+
+
+def _fake_genai():
+    genai = types.ModuleType("google.generativeai")
+    genai.configure = lambda api_key: None
+    genai.GenerativeModel = _FakeModel
+    genai.caching = types.SimpleNamespace(
+        CachedContent=types.SimpleNamespace(
+            create=mock.Mock(side_effect=lambda **kwargs: kwargs["contents"][0])
+        )
+    )
+    google = types.ModuleType("google")
+    google.generativeai = genai
+    return {"google": google, "google.generativeai": genai}
+
+
+class GeminiAdapterTest(unittest.TestCase):
+    def setUp(self):
+        modules = _fake_genai()
+        self.genai = modules["google.generativeai"]
+        patches = [
+            mock.patch.dict(sys.modules, modules),
+            mock.patch.dict(os.environ, {"GEMINI_API_KEY": "test"}),
+            mock.patch.dict(llm_adapter._response_cache, clear=True),
+            mock.patch.dict(llm_adapter._gemini_caches, clear=True),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.adapter = LLMAdapter("gemini")
+
+    def test_generate_sends_whole_prompt(self):
+        response = self.adapter.generate("make a page")
+
+        self.assertEqual(response, "FILE: src/App.tsx\nexport default 1;\n")
+        self.assertEqual(self.adapter.gemini_model.calls, [("make a page", False)])
+
+    def test_stream_yields_text_chunks(self):
+        chunks = list(self.adapter.stream("make a page"))
+
+        self.assertEqual("".join(chunks), "FILE: src/App.tsx\nexport default 1;\n")
+        self.assertNotIn("", chunks)
+        self.assertEqual(self.adapter.gemini_model.calls, [("make a page", True)])
+
+    def test_long_prefix_is_served_from_context_cache(self):
+        prefix = "P" * GEMINI_CACHE_MIN_CHARS
+
+        self.adapter.generate(prefix + "first", cached_prefix=prefix)
+        list(self.adapter.stream(prefix + "second", cached_prefix=prefix))
+
+        # One cache for both calls; only the suffix is sent
+        self.genai.caching.CachedContent.create.assert_called_once()
+        cached_model = llm_adapter._gemini_caches[next(iter(llm_adapter._gemini_caches))][0]
+        self.assertEqual(cached_model.cached_content, prefix)
+        self.assertEqual(cached_model.calls, [("first", False), ("second", True)])
+        self.assertEqual(self.adapter.gemini_model.calls, [])
+
+    def test_failed_context_cache_is_not_retried_until_ttl(self):
+        prefix = "P" * GEMINI_CACHE_MIN_CHARS
+        create = self.genai.caching.CachedContent.create
+        create.side_effect = RuntimeError("quota")
+
+        self.adapter.generate(prefix + "first", cached_prefix=prefix)
+        self.adapter.generate(prefix + "second", cached_prefix=prefix)
+
+        create.assert_called_once()
+        self.assertEqual(
+            self.adapter.gemini_model.calls,
+            [(prefix + "first", False), (prefix + "second", False)],
+        )
+
+    def test_short_prefix_is_sent_inline(self):
+        self.adapter.generate("short prefix, then the rest", cached_prefix="short prefix")
+
+        self.genai.caching.CachedContent.create.assert_not_called()
+        self.assertEqual(
+            self.adapter.gemini_model.calls, [("short prefix, then the rest", False)]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
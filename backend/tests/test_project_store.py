@@ -0,0 +1,57 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import project_store
+
+
+class ProjectIdTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        projects_dir = os.path.join(self.root, "projects")
+        patches = [
+            mock.patch.object(project_store, "PROJECTS_DIR", projects_dir),
+            mock.patch.object(
+                project_store, "PROJECT_INDEX_FILE", os.path.join(projects_dir, "_index.jsonl")
+            ),
+            mock.patch.object(
+                project_store, "PROJECTS_FILE", os.path.join(projects_dir, "projects.json")
+            ),
+            mock.patch.object(project_store, "_store_ready", False),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+        # A meta.json outside the store that a "../" id would reach
+        self.outside = os.path.join(self.root, "victim")
+        os.makedirs(self.outside)
+        with open(os.path.join(self.outside, "meta.json"), "w") as f:
+            json.dump({"project_id": "victim"}, f)
+
+    def test_ids_that_leave_the_store_are_refused(self):
+        for project_id in ("../victim", "a/b", "..", "", "x\\y"):
+            self.assertIsNone(project_store.get_project(project_id))
+            self.assertIsNone(project_store.update_project_timestamp(project_id))
+            self.assertFalse(project_store.delete_project(project_id))
+            with self.assertRaises(ValueError):
+                project_store.create_project(project_id, "name")
+        self.assertTrue(os.path.exists(os.path.join(self.outside, "meta.json")))
+
+    def test_plain_ids_round_trip(self):
+        project_store.create_project("3f1c-a_b", "demo")
+
+        self.assertEqual(project_store.get_project("3f1c-a_b")["name"], "demo")
+        self.assertTrue(project_store.delete_project("3f1c-a_b"))
+        self.assertIsNone(project_store.get_project("3f1c-a_b"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import types
+import unittest
+import zlib
+from unittest import mock
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from artifact import Artifact
+from state_rag_enums import ArtifactSource, ArtifactType
+from state_rag_manager import StateRAGManager
+
+
+def _artifact(path: str, content: str) -> Artifact:
+    return Artifact(
+        type=ArtifactType.component,
+        name=os.path.basename(path),
+        file_path=path,
+        content=content,
+        language="tsx",
+        source=ArtifactSource.ai_generated,
+    )
+
+
+def _active_paths(manager: StateRAGManager):
+    return sorted(a.file_path for a in manager.artifacts if a.is_active)
+
+
+class SharedManagerTest(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.base_dir)
+
+    def _fresh(self) -> StateRAGManager:
+        return StateRAGManager("p", base_dir=self.base_dir)
+
+    def _summary(self, manager: StateRAGManager):
+        return sorted((a.file_path, a.version, a.is_active) for a in manager.artifacts)
+
+    def test_concurrent_commits_and_retrieves_are_all_persisted(self):
+        manager = self._fresh()
+        errors = []
+
+        def commit(worker):
+            try:
+                for i in range(300):
+                    manager.commit(_artifact(f"src/components/W{worker}_{i % 40}.tsx", f"v{i}"))
+            except Exception as exc:
+                errors.append(exc)
+
+        def retrieve():
+            try:
+                for _ in range(300):
+                    manager.retrieve(limit=10)
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=commit, args=(w,)) for w in range(2)]
+        threads += [threading.Thread(target=retrieve) for _ in range(2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(_active_paths(manager)), 80)
+        self.assertEqual(self._summary(self._fresh()), self._summary(manager))
+
+    def test_manager_sees_commits_from_another_writer(self):
+        first, second = self._fresh(), self._fresh()
+        first.commit(_artifact("src/components/A.tsx", "a"))
+        second.commit(_artifact("src/components/B.tsx", "b"))
+
+        paths = [a.file_path for a in first.retrieve()]
+        self.assertEqual(paths, ["src/components/A.tsx", "src/components/B.tsx"])
+
+        first.commit(_artifact("src/components/C.tsx", "c"))
+        second.commit(_artifact("src/components/D.tsx", "d"))
+        self.assertEqual(len(_active_paths(self._fresh())), 4)
+        self.assertEqual(self._summary(self._fresh()), self._summary(second))
+
+
+class _WordEncoder:
+    # Bag of words hashed into a few dimensions; enough to rank by
+    def encode(self, texts, **kwargs):
+        vectors = np.zeros((len(texts), 64), dtype="float32")
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, zlib.crc32(word.encode()) % 64] += 1.0
+        return vectors
+
+
+class SemanticRankingTest(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.base_dir)
+        fake = types.ModuleType("embedding_model")
+        fake.load_embedding_model = _WordEncoder
+        # Restoring sys.modules drops anything imported under the patch;
+        # faiss is imported above so the extension is never loaded twice.
+        patcher = mock.patch.dict(sys.modules, {"embedding_model": fake})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _fresh(self) -> StateRAGManager:
+        return StateRAGManager("p", base_dir=self.base_dir)
+
+    def test_repeated_query_reuses_ranked_ids_until_a_commit(self):
+        manager = self._fresh()
+        for name in ("Header", "Footer", "Sidebar"):
+            # Repeated so the name dominates the embedded text
+            manager.commit(_artifact(f"src/components/{name}.tsx", f"{name} " * 20))
+        first = manager.retrieve(limit=1, user_query="header")
+        self.assertEqual([a.name for a in first], ["Header.tsx"])
+
+        # Same query and revision: no index or model work at all
+        with mock.patch.object(
+            StateRAGManager, "_ensure_faiss_ready", side_effect=AssertionError
+        ):
+            self.assertEqual(manager.retrieve(limit=1, user_query="header"), first)
+
+        manager.commit(_artifact("src/components/Header.tsx", "header " * 21))
+        with mock.patch.object(
+            StateRAGManager,
+            "_ensure_faiss_ready",
+            autospec=True,
+            side_effect=StateRAGManager._ensure_faiss_ready,
+        ) as ready:
+            second = manager.retrieve(limit=1, user_query="header")
+        ready.assert_called_once()
+        self.assertEqual([a.version for a in second], [2])
+
+    def test_index_is_saved_on_flush_and_extended_on_load(self):
+        manager = self._fresh()
+        for name in ("Header", "Footer", "Sidebar"):
+            manager.commit(_artifact(f"src/components/{name}.tsx", name))
+        manager.retrieve(limit=1, user_query="header")
+        manager.commit(_artifact("src/components/Modal.tsx", "modal"))
+
+        # Commits keep the index in memory only
+        self.assertFalse(os.path.exists(manager.faiss_path))
+        self.assertFalse(os.path.exists(manager.embeddings_path))
+
+        manager.flush_index()
+        saved_mtime = os.stat(manager.faiss_path).st_mtime_ns
+        manager.commit(_artifact("src/components/Card.tsx", "card"))
+
+        reloaded = self._fresh()
+        reloaded.retrieve(limit=1, user_query="card")
+        self.assertEqual(sorted(reloaded._faiss_ids), sorted(manager._faiss_ids))
+        self.assertEqual(reloaded._faiss_index.ntotal, 5)
+        self.assertEqual(os.stat(manager.faiss_path).st_mtime_ns, saved_mtime)
+
+        manager.compact()
+        self.assertNotEqual(os.stat(manager.faiss_path).st_mtime_ns, saved_mtime)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import List, Dict, Optional
+from typing import AbstractSet, Dict, Iterable, List, Optional
 
 from artifact import Artifact
 from state_rag_enums import ArtifactSource
@@ -28,44 +28,73 @@ class ValidationResult:
 # =========================
 
 class ValidationRule:
+    # False for rules that need the whole proposal set to decide
+    per_file: bool = True
+
     def check(
         self,
         proposed: List[ProposedArtifact],
         active: Dict[str, Artifact],
         allowed_paths: List[str],
     ) -> ValidationResult:
+        for p in proposed:
+            result = self.check_file(p, active, allowed_paths)
+            if result is not None:
+                return result
+        return ValidationResult(ok=True)
+
+    def check_file(
+        self,
+        p: ProposedArtifact,
+        active: Dict[str, Artifact],
+        allowed_paths: List[str],
+    ) -> Optional[ValidationResult]:
+        """
+        Per-file rules: the failure for this one file, or None if it passes.
+        """
         raise NotImplementedError
-def _is_allowed(file_path: str, allowed_paths: List[str]) -> bool:
+
+
+_EXT_FOR_LANG = {
+    "tsx": ".tsx",
+    "ts": ".ts",
+    "js": ".js",
+    "json": ".json",
+}
+
+
+def _is_allowed(file_path: str, allowed_paths: AbstractSet[str]) -> bool:
     return "*" in allowed_paths or file_path in allowed_paths
 
+
+def allowed_path_set(allowed_paths: Iterable[str]) -> AbstractSet[str]:
+    """
+    allowed_paths as a set, so each _is_allowed check is O(1) instead of
+    two scans of the list. Sets are passed through unchanged.
+    """
+    if isinstance(allowed_paths, (set, frozenset)):
+        return allowed_paths
+    return frozenset(allowed_paths)
+
 # -------------------------
 # 1. Syntax Validator
 # -------------------------
 
 class SyntaxValidator(ValidationRule):
-    def check(self, proposed, active, allowed_paths):
-        for p in proposed:
-            if not p.content or not p.content.strip():
-                return ValidationResult(
-                    ok=False,
-                    reason=f"Empty content for {p.file_path}"
-                )
-
-            if not p.file_path.endswith(self._ext_for_lang(p.language)):
-                return ValidationResult(
-                    ok=False,
-                    reason=f"Language/file mismatch for {p.file_path}"
-                )
+    def check_file(self, p, active, allowed_paths):
+        if not p.content or not p.content.strip():
+            return ValidationResult(
+                ok=False,
+                reason=f"Empty content for {p.file_path}"
+            )
 
-        return ValidationResult(ok=True)
+        if not p.file_path.endswith(_EXT_FOR_LANG.get(p.language, "")):
+            return ValidationResult(
+                ok=False,
+                reason=f"Language/file mismatch for {p.file_path}"
+            )
 
-    def _ext_for_lang(self, lang: str) -> str:
-        return {
-            "tsx": ".tsx",
-            "ts": ".ts",
-            "js": ".js",
-            "json": ".json",
-        }.get(lang, "")
+        return None
 
 
 # -------------------------
@@ -78,29 +107,28 @@ class AuthorityValidator(ValidationRule):
     - User-modified files CAN be modified if they're in allowed_paths
     - Only block if user file is NOT in allowed_paths (user didn't give permission)
     """
-    def check(self, proposed, active, allowed_paths):
-        for p in proposed:
-            if p.file_path in active:
-                old = active[p.file_path]
-
-                # BUG WAS HERE: Logic was inverted!
-                # OLD (WRONG): if user_modified AND not in allowed_paths -> block
-                # NEW (CORRECT): if user_modified AND in allowed_paths -> ALLOW
-                #                if user_modified AND not in allowed_paths -> BLOCK
-                
-                if old.source == ArtifactSource.user_modified:
-                    if not _is_allowed(p.file_path, allowed_paths):
-                        # User file but NOT in allowed list = unauthorized
-                        return ValidationResult(
-                            ok=False,
-                            reason=(
-                                f"Unauthorized modification of user file: "
-                                f"{p.file_path}. User must explicitly allow this file."
-                            )
+    def check_file(self, p, active, allowed_paths):
+        if p.file_path in active:
+            old = active[p.file_path]
+
+            # BUG WAS HERE: Logic was inverted!
+            # OLD (WRONG): if user_modified AND not in allowed_paths -> block
+            # NEW (CORRECT): if user_modified AND in allowed_paths -> ALLOW
+            #                if user_modified AND not in allowed_paths -> BLOCK
+            
+            if old.source == ArtifactSource.user_modified:
+                if not _is_allowed(p.file_path, allowed_paths):
+                    # User file but NOT in allowed list = unauthorized
+                    return ValidationResult(
+                        ok=False,
+                        reason=(
+                            f"Unauthorized modification of user file: "
+                            f"{p.file_path}. User must explicitly allow this file."
                         )
-                    # else: User file IS in allowed_paths = OK! Continue.
+                    )
+                # else: User file IS in allowed_paths = OK! Continue.
 
-        return ValidationResult(ok=True)
+        return None
 
 
 # -------------------------
@@ -108,14 +136,13 @@ class AuthorityValidator(ValidationRule):
 # -------------------------
 
 class ScopeValidator(ValidationRule):
-    def check(self, proposed, active, allowed_paths):
-        for p in proposed:
-            if not _is_allowed(p.file_path, allowed_paths):
-                return ValidationResult(
-                    ok=False,
-                    reason=f"Out-of-scope modification: {p.file_path}"
-                )
-        return ValidationResult(ok=True)
+    def check_file(self, p, active, allowed_paths):
+        if not _is_allowed(p.file_path, allowed_paths):
+            return ValidationResult(
+                ok=False,
+                reason=f"Out-of-scope modification: {p.file_path}"
+            )
+        return None
 
 
 # -------------------------
@@ -123,6 +150,8 @@ class ScopeValidator(ValidationRule):
 # -------------------------
 
 class ConsistencyValidator(ValidationRule):
+    per_file = False
+
     def check(self, proposed, active, allowed_paths):
         seen = set()
         for p in proposed:
@@ -155,20 +184,74 @@ class Validator:
         active_artifacts: List[Artifact],
         allowed_paths: List[str],
     ) -> ValidationResult:
-
         active_lookup = {
             a.file_path: a
             for a in active_artifacts
             if a.is_active
         }
+        return self.validate_lookup(proposed, active_lookup, allowed_paths)
 
+    def validate_lookup(
+        self,
+        proposed: List[ProposedArtifact],
+        active_lookup: Dict[str, Artifact],
+        allowed_paths: List[str],
+    ) -> ValidationResult:
+        """
+        validate() for callers that already hold the active artifacts
+        keyed by file path, skipping the pass that filters and indexes
+        them.
+        """
+        allowed_paths = allowed_path_set(allowed_paths)
+
+        # One pass over the proposals for every per-file rule. The result
+        # is the same as running the rules one after another: the first
+        # failing rule wins, and within it the first failing file. Once a
+        # rule fails, later rules can no longer decide the outcome and
+        # are skipped for the remaining files.
+        failures: Dict[int, ValidationResult] = {}
+        pending = [(i, rule) for i, rule in enumerate(self.rules) if rule.per_file]
+        for p in proposed:
+            if not pending:
+                break
+            for n, (i, rule) in enumerate(pending):
+                result = rule.check_file(p, active_lookup, allowed_paths)
+                if result is not None:
+                    failures[i] = result
+                    pending = pending[:n]
+                    break
+
+        for i, rule in enumerate(self.rules):
+            if i in failures:
+                return failures[i]
+            if not rule.per_file:
+                result = rule.check(
+                    proposed=proposed,
+                    active=active_lookup,
+                    allowed_paths=allowed_paths,
+                )
+                if not result.ok:
+                    return result
+
+        return ValidationResult(ok=True, artifacts=proposed)
+
+    def validate_single(
+        self,
+        proposed: ProposedArtifact,
+        active_lookup: Dict[str, Artifact],
+        allowed_paths: List[str],
+    ) -> ValidationResult:
+        """
+        Per-file rules only, for checking files as they stream in.
+        validate() still has to run on the complete set. Callers checking
+        many files should pass allowed_path_set(allowed_paths).
+        """
+        allowed_paths = allowed_path_set(allowed_paths)
         for rule in self.rules:
-            result = rule.check(
-                proposed=proposed,
-                active=active_lookup,
-                allowed_paths=allowed_paths,
-            )
-            if not result.ok:
+            if not rule.per_file:
+                continue
+            result = rule.check_file(proposed, active_lookup, allowed_paths)
+            if result is not None:
                 return result
 
-        return ValidationResult(ok=True, artifacts=proposed)
\ No newline at end of file
+        return ValidationResult(ok=True, artifacts=[proposed])